@@ -1,34 +1,135 @@
 import pandas as pd
 import re
-
-# Correcting an annoying DtypeWarning
-dtype_spec = {16: str, 26: str, 27: str, 32: str,
-              37: str, 41: str, 42: str, 43: str,
-              45: str, 82: str, 85: str, 87: str}
-
-df = pd.read_csv("NOAA_LCD_BattleCreek_2024.csv", dtype=dtype_spec)
-
-# Rows below have additional data that are making cleaning more cumbersome.
-df = df[df["REPORT_TYPE"] != "SOD  "]  # These are at 23:59 when there is no flying and ACFT are in the hangars.
-df = df[df["REPORT_TYPE"] != "SOM  "]  # Same as "SOD" but at the end of the month.
+from disk_cache import DiskCache, code_fingerprint, file_fingerprint
+from lcd_reader import read_lcd
+from hourly_grid import HourlyGrid, build_hourly_grid
+from instrumentation import stage, traced
+from metar import decode_metar_frame, format_metar_frame, parse_metar_reports, sky_and_weather
+from rolling_features import WINDOWS, STATS, rolling_features
+
+NOAA_CSV = "NOAA_LCD_BattleCreek_2024.csv"
+
+LABELS = ["HourlyAltimeterSetting", "HourlyDewPointTemperature", "HourlyDryBulbTemperature",
+          "HourlyPrecipitation", "HourlyPresentWeatherType", "HourlyRelativeHumidity", "HourlySkyConditions",
+          "HourlyVisibility", "HourlyWindDirection", "HourlyWindGustSpeed", "HourlyWindSpeed"]
+# HourlySkyConditions and HourlyPresentWeatherType are codes, not numbers, and are dropped when cleaning
+NUMERIC_LABELS = [label for label in LABELS if label not in ("HourlySkyConditions", "HourlyPresentWeatherType")]
+
+# Changing any of these modules changes what the stages contain, so it invalidates the disk cache.
+CLEANING_MODULES = (__name__, "lcd_reader", "metar", "column_regex", "rolling_features", "hourly_grid")
+
+
+# Importing this module no longer reads the csv. A NOAALoader only touches the disk when a stage is
+# asked for, and each stage is kept in memory so the next call is free.
+# Given a DiskCache, stages are also saved on disk under a hash of the csv contents, the stage parameters
+# and the cleaning code, so the next process reloads them instead of cleaning the csv again.
+class NOAALoader:
+    def __init__(self, path=NOAA_CSV, cache=None):
+        self.path = path
+        self.cache = cache
+        self._stages = {}
+        self._fingerprint = None
+
+    # Build a stage once and hand back a copy, so callers can't change what is cached.
+    def _stage(self, key, build):
+        if key not in self._stages:
+            self._stages[key] = self._load_or_build(key, build)
+        return self._stages[key].copy()
+
+    def _load_or_build(self, key, build):
+        if self.cache is None:
+            return build()
+
+        disk_key = self.cache.key(self.fingerprint(), key)
+        df = self.cache.get(disk_key)
+        if df is None:
+            df = build()
+            self.cache.put(disk_key, df)
+        return df
+
+    # Hash of the csv and the cleaning code, worked out once per loader.
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = (file_fingerprint(self.path), code_fingerprint(*CLEANING_MODULES))
+        return self._fingerprint
+
+    # Forget every cached stage, e.g. after the csv has been replaced. disk=True also empties the disk cache.
+    def clear(self, disk=False):
+        self._stages.clear()
+        self._fingerprint = None
+        if disk and self.cache is not None:
+            self.cache.invalidate()
+
+    def raw(self):
+        return self._stage("raw", lambda: read_NOAA_csv(self.path))
+
+    def df_A(self):
+        return self._stage("df_A", lambda: build_df_A(self.raw()))
+
+    def df_B(self, formatted=False):
+        if formatted:
+            return self._stage("df_B_formatted", lambda: format_metar_frame(self.df_B()))
+        return self._stage("df_B", lambda: build_df_B(self.raw()))
+
+    # Every METAR group (cloud layers, present weather, gusts, ...) decoded by the full grammar in metar.py
+    def metar(self):
+        return self._stage("metar", lambda: build_metar(self.raw()))
+
+    def NOAA_to_float_and_interpolate(self, sky_and_weather=False):
+        metar = self.metar() if sky_and_weather else None
+        return self._stage(("float", sky_and_weather), lambda: to_float_and_interpolate(self.df_A(), metar))
+
+    def get_cleaned_NOAA_df(self, prev_days=5, sky_and_weather=False):
+        return self._stage(("cleaned", prev_days, sky_and_weather),
+                           lambda: clean_NOAA_df(self.NOAA_to_float_and_interpolate(sky_and_weather), prev_days))
+
+    # The cleaned columns on a fixed grid (hourly by default), see hourly_grid.py
+    def hourly_grid(self, freq="1h", sky_and_weather=False):
+        return HourlyGrid.from_frame(self._stage(("grid", freq, sky_and_weather), lambda: build_hourly_grid(
+            change_NOAA_columns(self.NOAA_to_float_and_interpolate(sky_and_weather)),
+            self.raw()["REPORT_TYPE"].astype(str).to_numpy(), freq).to_frame()))
+
+    # The interpolated columns plus every window x statistic from rolling_features
+    def get_NOAA_features(self, windows=WINDOWS, stats=STATS, sky_and_weather=False):
+        return self._stage(("features", tuple(windows), tuple(stats), sky_and_weather),
+                           lambda: NOAA_features(self.NOAA_to_float_and_interpolate(sky_and_weather), windows, stats))
+
+
+@traced("NOAA.read_csv")
+def read_NOAA_csv(path):
+    # read_lcd only reads the columns we use, already typed. Trace and flagged values keep their numbers.
+    with stage("NOAA.read_lcd") as s:
+        df = read_lcd(path)
+        s.rows = len(df)
+    return drop_summary_rows(df)
+
+
+@traced("NOAA.drop_summary_rows")
+def drop_summary_rows(df):
+    # Rows below have additional data that are making cleaning more cumbersome.
+    # SOD rows are at 23:59 when there is no flying and ACFT are in the hangars.
+    # SOM rows are the same as "SOD" but at the end of the month.
+    df = df[~df["REPORT_TYPE"].isin(["SOD", "SOM"])].copy()
+    df["REPORT_TYPE"] = df["REPORT_TYPE"].cat.remove_unused_categories()
+
+    df["REM"] = df["REM"].str.replace(METAR_PREFIX, '', regex=True)
+    return df
 
 
-def df_A():
-    df["DATE"] = pd.to_datetime(df["DATE"])
-    labels = ["HourlyAltimeterSetting", "HourlyDewPointTemperature", "HourlyDryBulbTemperature",
-              "HourlyPrecipitation", "HourlyPresentWeatherType", "HourlyRelativeHumidity", "HourlySkyConditions",
-              "HourlyVisibility", "HourlyWindDirection", "HourlyWindGustSpeed", "HourlyWindSpeed"]
-    df.index = df["DATE"]
+@traced("NOAA.df_A")
+def build_df_A(df):
+    df = df.set_index(df["DATE"])
 
-    return df[labels]
+    return df[LABELS]
 
 
 # There is an additional timestamp on the METAR reports that needs to be removed.
-def extract_metar_text(line):
-    return re.sub(r'^MET\w+\s\d{2}/\d{2}/\d{2} \d{2}:\d{2}:\d{2} ', '', str(line))
+# e.g. "MET09601/01/24 00:19:02 SPECI KBTL ..." -> "SPECI KBTL ..."
+METAR_PREFIX = r'^MET\d{3}\d{2}/\d{2}/\d{2} \d{2}:\d{2}:\d{2} '
 
 
-df["REM"] = df["REM"].apply(extract_metar_text)
+def extract_metar_text(line):
+    return re.sub(METAR_PREFIX, '', str(line))
 
 
 # The metar needs to be decoded separately
@@ -79,25 +180,39 @@ def decode_metar(metar):
     return result
 
 
-# The decoded metar is parsed into a df
-def df_B():
-    decoded = df["REM"].apply(decode_metar)
-    df_B = pd.json_normalize(decoded)
-    labels = ["wind", "visibility", "temperature", "dew_point", "pressure"]
-    df_B = df_B[labels]
-    df_B.index = df["DATE"]
+# The decoded metar is parsed into a df.
+# decode_metar_frame decodes the whole column at once into numeric columns with the same index as df_A.
+# NOAALoader.df_B(formatted=True) turns those back into the strings decode_metar returns (format_metar_frame).
+@traced("NOAA.df_B")
+def build_df_B(df):
+    return decode_metar_frame(df["REM"].set_axis(pd.Index(df["DATE"])))
 
-    return df_B
 
+# Every group of every METAR, decoded by the token grammar in metar.py, on the same index as df_A
+@traced("NOAA.parse_metar_reports")
+def build_metar(df):
+    return parse_metar_reports(df["REM"].set_axis(pd.Index(df["DATE"])))
 
-# Take the result of df_A(), change all values to floats and fill NaNs.
-def NOAA_to_float_and_interpolate():
-    df = df_A()
-    # Drop HourlySkyConditions and HourlyPresentWeatherType to simplify the data
-    df = df.drop(columns=["HourlySkyConditions", "HourlyPresentWeatherType"], errors='ignore')
 
-    # Convert all columns except index to numeric, keep NaNs for now.
-    df = df.apply(pd.to_numeric, errors='coerce').astype(float)
+# The NUMERIC_LABELS columns as floats, NaN where a value isn't a number.
+# The batch, multi-file and streaming cleaners all convert through this.
+def numeric_labels(df):
+    return df[NUMERIC_LABELS].apply(pd.to_numeric, errors='coerce').astype(float)
+
+
+# Take the result of df_A(), change all values to floats and fill NaNs.
+# If the parsed METARs are passed in, their sky cover, ceiling and weather columns take the place of
+# HourlySkyConditions and HourlyPresentWeatherType.
+@traced("NOAA.to_float_and_interpolate")
+def to_float_and_interpolate(df, metar=None):
+    # Drop HourlySkyConditions and HourlyPresentWeatherType to simplify the data,
+    # and convert all columns except index to numeric, keep NaNs for now.
+    with stage("NOAA.to_numeric") as s:
+        df = numeric_labels(df)
+        s.rows = len(df)
+    if metar is not None:
+        for col, values in sky_and_weather(metar).items():
+            df[col] = values.to_numpy()
 
     df = df.reset_index()
     df['DATE'] = pd.to_datetime(df['DATE'], errors='coerce')
@@ -105,7 +220,9 @@ def NOAA_to_float_and_interpolate():
     # Interpolate numeric columns so the NaNs are filled with the 'average' value instead of zero
     # Use select_dtypes method to include only the columns that contain numbers.
     numeric_cols = df.select_dtypes(include='number').columns
-    df[numeric_cols] = df[numeric_cols].interpolate(method='linear', limit_direction='both')
+    with stage("NOAA.interpolate") as s:
+        df[numeric_cols] = df[numeric_cols].interpolate(method='linear', limit_direction='both')
+        s.rows = len(df)
 
     return df
 
@@ -128,27 +245,70 @@ def change_NOAA_columns(df):
 
 
 # For every numerical column in NOAA_df, add a new column that contains the average for the 5 days prior to a downed event
+# rolling_features computes any set of windows and statistics in one pass; this keeps the single average.
+@traced("NOAA.add_avg_prev_columns")
 def add_avg_prev_columns(df, columns, prev_days=5):
     df = df.copy()
     df['DATE'] = pd.to_datetime(df['DATE'])
-    df = df.sort_values('DATE').set_index('DATE')
+    # A stable sort keeps reports with the same timestamp in file order
+    df = df.sort_values('DATE', kind='stable').reset_index(drop=True)
 
-    # Use rolling method to get the average value for the number of prev_days before the current_date.
-    for col in columns:
-        df[f'avg_{col}_prev_{prev_days}d'] = df[col].rolling(f'{prev_days}D').mean()
-
-    df = df.reset_index()
-    return df
+    with stage("NOAA.rolling_features") as s:
+        features = rolling_features(df, columns, windows=(prev_days,), stats=("mean",))
+        s.rows = len(features)
+    return pd.concat([df, features], axis=1)
 
 
-# When it is time to merge and analyze, just call this function.
-def get_cleaned_NOAA_df(prev_days=5):
-    df = NOAA_to_float_and_interpolate()
+# Rename the interpolated columns and add the rolling averages.
+@traced("NOAA.clean_NOAA_df")
+def clean_NOAA_df(df, prev_days=5):
     df = change_NOAA_columns(df)
     numeric_cols = df.select_dtypes(include='number').columns.tolist()
     df = add_avg_prev_columns(df, columns=numeric_cols, prev_days=prev_days)
     return df
 
-test = get_cleaned_NOAA_df()
 
-# print(test.head())
\ No newline at end of file
+# Like clean_NOAA_df, but with min/max/std/sum as well as the average over several windows.
+@traced("NOAA.NOAA_features")
+def NOAA_features(df, windows=WINDOWS, stats=STATS):
+    df = change_NOAA_columns(df)
+    df = df.sort_values('DATE', kind='stable').reset_index(drop=True)
+    numeric_cols = df.select_dtypes(include='number').columns.tolist()
+    with stage("NOAA.rolling_features") as s:
+        features = rolling_features(df, numeric_cols, windows, stats)
+        s.rows = len(features)
+    return pd.concat([df, features], axis=1)
+
+
+# The module level functions below use a shared loader for NOAA_CSV, so existing imports keep working.
+# It keeps its stages in .noaa_cache between runs. Use NOAALoader("some_other_file.csv") to clean a different LCD export.
+loader = NOAALoader(cache=DiskCache())
+
+
+def df_A():
+    return loader.df_A()
+
+
+def df_B(formatted=False):
+    return loader.df_B(formatted)
+
+
+def NOAA_to_float_and_interpolate(sky_and_weather=False):
+    return loader.NOAA_to_float_and_interpolate(sky_and_weather)
+
+
+# When it is time to merge and analyze, just call this function.
+# sky_and_weather=True adds sky cover, ceiling and rain/snow/fog/thunder columns decoded from the METARs.
+def get_cleaned_NOAA_df(prev_days=5, sky_and_weather=False):
+    return loader.get_cleaned_NOAA_df(prev_days, sky_and_weather)
+
+
+# Averages, minima, maxima, standard deviations and totals over 1/3/5/7/14/30 days by default,
+# named avg_{col}_prev_{n}d, min_{col}_prev_{n}d, ...
+def get_NOAA_features(windows=WINDOWS, stats=STATS, sky_and_weather=False):
+    return loader.get_NOAA_features(windows, stats, sky_and_weather)
+
+
+# The cleaned NOAA data with one row per hour in contiguous arrays: grid.lookup(timestamp) is O(1)
+def get_hourly_grid(freq="1h", sky_and_weather=False):
+    return loader.hourly_grid(freq, sky_and_weather)
@@ -0,0 +1,86 @@
+import os
+import pickle
+
+import pandas as pd
+
+from disk_cache import CACHE_FORMAT, read_frame, write_frame
+from lcd_reader import read_lcd
+from NOAA_stream import NOAAStreamCleaner, numeric_rows
+
+# Keep the cleaned NOAA frame on disk and add new observations to it without rebuilding the year.
+# The store is a directory of:
+#   part-000000000000.parquet, ...  rows that can no longer change
+#   tail.parquet                    the last rows, whose trailing NaNs are only forward filled for now
+#   state.pkl                       the NOAAStreamCleaner: last valid values, rows still waiting, the rolling window
+# append() feeds only the new rows through the cleaner. Rows in the tail get their final values once a later
+# valid value arrives, and the rolling window is continued from the saved rows, so an append costs about
+# as much as the new data plus the gap at the boundary and one prev_days window.
+
+
+class CleanedNOAAStore:
+    def __init__(self, directory, prev_days=5):
+        self.directory = directory
+        self.prev_days = prev_days
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def parts(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if name.startswith("part-") and name.endswith(f".{CACHE_FORMAT}"))
+
+    def _load_state(self):
+        path = self._path("state.pkl")
+        if not os.path.exists(path):
+            return NOAAStreamCleaner(self.prev_days)
+        with open(path, "rb") as f:
+            cleaner = pickle.load(f)
+        if cleaner.prev_days != self.prev_days:
+            raise ValueError(f"Store was built with prev_days={cleaner.prev_days}, not {self.prev_days}")
+        return cleaner
+
+    # Add new LCD rows: a csv path, or a frame from lcd_reader.read_lcd. They must not be older than the last row.
+    def append(self, new_rows):
+        if isinstance(new_rows, (str, os.PathLike)):
+            new_rows = read_lcd(new_rows)
+        rows = numeric_rows(new_rows)
+        if rows.empty:
+            return
+
+        cleaner = self._load_state()
+        last = self.last_date(cleaner)
+        if last is not None and rows["DATE"].iloc[0] < last:
+            raise ValueError(f"New rows start at {rows['DATE'].iloc[0]}, before the last stored row at {last}")
+
+        os.makedirs(self.directory, exist_ok=True)
+        done = cleaner.feed(rows)
+        if len(done):
+            # Parts are named by their first row number, so retrying an interrupted append overwrites the same file
+            write_frame(done, self._path(f"part-{done.index[0]:012d}.{CACHE_FORMAT}"))
+        write_frame(cleaner.flush(), self._path(f"tail.{CACHE_FORMAT}"))
+
+        # The state is written last, so an interrupted append leaves the old state to be retried
+        tmp = self._path("state.pkl.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(cleaner, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self._path("state.pkl"))
+
+    @staticmethod
+    def last_date(cleaner):
+        for frame in (cleaner.pending, cleaner.tail):
+            if frame is not None and len(frame):
+                return frame["DATE"].iloc[-1]
+        return None
+
+    # The whole cleaned frame, the same as get_cleaned_NOAA_df(prev_days) on all of the rows appended so far.
+    def load(self):
+        frames = [read_frame(self._path(name)) for name in self.parts()]
+        tail = self._path(f"tail.{CACHE_FORMAT}")
+        if os.path.exists(tail):
+            frames.append(read_frame(tail))
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+from lcd_reader import iter_lcd
+from NOAA import drop_summary_rows, change_NOAA_columns, numeric_labels
+from rolling_features import rolling_features
+
+# Streaming version of get_cleaned_NOAA_df for LCD exports that don't fit in memory.
+# The csv is read in chunks and only a little state is carried from one chunk to the next:
+#   - for each column, the last valid value and its row number, so NaNs can be interpolated across the boundary
+#   - rows that can't be finished yet, because a column has no valid value after them so far
+#   - the rows inside the rolling window of the last row written
+# NOAA_to_float_and_interpolate interpolates by row number (method='linear'), which is exactly np.interp between
+# the neighbouring valid values, and clamps to the first / last valid value at the ends (limit_direction='both').
+# So the rows come out the same as the in-memory path, and memory stays bounded by the chunk size,
+# the rolling window and the longest run of missing values.
+
+
+class NOAAStreamCleaner:
+    def __init__(self, prev_days=5):
+        self.prev_days = prev_days
+        self.window = pd.Timedelta(days=prev_days)
+        self.columns = None
+        self.position = 0     # row number of the next row fed in
+        self.anchors = {}     # column -> (row number, value) of its last valid value already written
+        self.pending = None   # rows fed in but not written yet
+        self.tail = None      # written rows still inside the rolling window
+
+    # Feed the next rows (DATE plus numeric columns, in date order). Returns the rows that are now final.
+    def feed(self, chunk):
+        chunk = chunk.set_axis(pd.RangeIndex(self.position, self.position + len(chunk)))
+        self.position += len(chunk)
+        buffer = chunk if self.pending is None else pd.concat([self.pending, chunk])
+        if self.columns is None:
+            self.columns = [col for col in buffer.columns if col != "DATE"]
+
+        # A row is final once every column has a valid value at or after it
+        ready = buffer.index[-1]
+        for col in self.columns:
+            valid = buffer.index[buffer[col].notna().to_numpy()]
+            if len(valid):
+                ready = min(ready, valid[-1])
+            else:
+                ready = min(ready, buffer.index[0] - 1)
+
+        done, self.pending = buffer.loc[:ready], buffer.loc[ready + 1:]
+        if self.pending.empty:
+            self.pending = None
+        if done.empty:
+            return done.iloc[:0]
+
+        filled = self._interpolate(done, buffer)
+        for col in self.columns:
+            valid = done.index[done[col].notna().to_numpy()]
+            if len(valid):
+                self.anchors[col] = (valid[-1], done.at[valid[-1], col])
+        return self._roll(filled, keep_tail=True)
+
+    # The rows still waiting, finished as if the file ended here: trailing NaNs take the last valid value.
+    # The state is left alone, so more rows can still be fed in afterwards.
+    def flush(self):
+        if self.pending is None:
+            return pd.DataFrame()
+        return self._roll(self._interpolate(self.pending, self.pending), keep_tail=False)
+
+    def _interpolate(self, rows, buffer):
+        filled = rows.copy()
+        positions = rows.index.to_numpy(dtype="float64")
+        for col in self.columns:
+            missing = filled[col].isna().to_numpy()
+            if not missing.any():
+                continue
+
+            valid = buffer[col].notna().to_numpy()
+            xp = buffer.index.to_numpy(dtype="float64")[valid]
+            fp = buffer[col].to_numpy(dtype="float64")[valid]
+            if col in self.anchors:
+                xp = np.concatenate([[self.anchors[col][0]], xp])
+                fp = np.concatenate([[self.anchors[col][1]], fp])
+            if len(xp):
+                filled.loc[missing, col] = np.interp(positions[missing], xp, fp)
+        return filled
+
+    def _roll(self, filled, keep_tail):
+        frame = filled if self.tail is None else pd.concat([self.tail, filled])
+        features = rolling_features(frame, self.columns, windows=(self.prev_days,), stats=("mean",))
+        out = pd.concat([frame, features], axis=1).loc[filled.index]
+
+        if keep_tail:
+            self.tail = frame[frame["DATE"] > frame["DATE"].iloc[-1] - self.window]
+        return out
+
+
+# Turn typed LCD rows into the float columns the cleaner is fed, the same way df_A + to_float_and_interpolate do.
+def numeric_rows(df):
+    df = drop_summary_rows(df)
+    return change_NOAA_columns(pd.concat([df[["DATE"]], numeric_labels(df)], axis=1))
+
+
+# Yield the cleaned NOAA frame in pieces, reading at most chunksize csv rows at a time.
+# pd.concat of the pieces equals get_cleaned_NOAA_df(prev_days) for a file sorted by DATE.
+def iter_cleaned_NOAA(path, prev_days=5, chunksize=100_000):
+    cleaner = NOAAStreamCleaner(prev_days)
+    for chunk in iter_lcd(path, chunksize=chunksize):
+        done = cleaner.feed(numeric_rows(chunk))
+        if len(done):
+            yield done
+    rest = cleaner.flush()
+    if len(rest):
+        yield rest
+
+
+# Write the cleaned frame to a csv without ever holding the whole file in memory.
+def stream_cleaned_NOAA(path, out_path, prev_days=5, chunksize=100_000):
+    header = True
+    for piece in iter_cleaned_NOAA(path, prev_days, chunksize):
+        piece.to_csv(out_path, mode="w" if header else "a", header=header, index=False)
+        header = False
@@ -1,27 +1,38 @@
 import pandas as pd
 import re
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-from NOAA import df_A, df_B, get_cleaned_NOAA_df
+import NOAA
+from NOAA import CLEANING_MODULES, NOAA_CSV
+from maintenance_data import HISTORY_CSV, REASON_CSV
 from reason_data import downed
 from historical_data import total_down_time, fleet_average_down_time, history
+from fleet_availability import fleet_availability
+from weather_join import point_in_time_join
+from instrumentation import stage, traced
+from pipeline import Stage, main
+from charts import draw_charts
+
+# Nothing runs on import. Every step below is a stage of the pipeline declared in STAGES at the bottom, run with
+#   python WMU_NOAA_Analysis.py                 the report and the SPLOM
+#   python WMU_NOAA_Analysis.py charts df_A --force merged
+#   python WMU_NOAA_Analysis.py --list
+# Stages whose inputs, parameters and code haven't changed since the last run are skipped, NOAA cleaning and
+# maintenance parsing run at the same time, and the time of every stage is printed at the end.
+# --trace trace.json also times the steps inside the stages (csv reading, METAR decoding, interpolation, duration
+# parsing, the join, ...) with their memory and rows, see instrumentation.py.
+# The charts are rendered from charts.CATALOG into Charts/ instead of being shown: "splom" renders the SPLOM,
+# "charts" every chart. Either one skips the charts whose data hasn't changed.
 
-# Correlations
-df_A = df_A()
-df_B = df_B()
+# The 50 hour, 100 hour, and Annual inspections occur on a schedule, and the Unspecified reasons don't give any indications, so all those can be removed from analysis.
+EXCLUDED_REASONS = ['50 Hr Inspect', '100 Hr Inspect', 'Annual Inspect', 'Unspecified']
+
+MAINTENANCE_MODULES = ("maintenance_data", "durations", "column_regex")
 
-# Labels and attributes
-RMS_tot_down_time = total_down_time()
-RMS_avg_down_time = fleet_average_down_time()
-history_df = history()
-downed_df = downed()
-NOAA_df = get_cleaned_NOAA_df()
 
 # This is to track the effect of cleaning a dataframe
-def descriptives():
-    print("RMS reported average down time:", RMS_avg_down_time)
-    print("RMS reported down time:", RMS_tot_down_time, "\n")
+def descriptives(history_df, downed_df):
+    print("RMS reported average down time:", fleet_average_down_time())
+    print("RMS reported down time:", total_down_time(), "\n")
 
     downed_total_time = np.sum(downed_df["duration"])
     downed_avg = np.mean(downed_df["duration"])
@@ -30,186 +41,71 @@ def descriptives():
     history_total_time = np.sum(history_df["duration"])
     history_avg = np.mean(history_df["duration"])
     print("Average down time in 'history' df:", history_avg)
-    print("Downed time in 'history' df:", history_total_time)
+    print("Downed time in 'history' df:", history_total_time, "\n")
+    availability = fleet_availability(downed_df, "1D", "2024-01-01", "2025-01-01")
+    print("Average aircraft down per day in 2024:", round(availability["aircraft down"].mean(), 2))
+    print("Lowest daily fleet availability in 2024:", round(availability["availability"].min(), 3))
 
-    return print("_" * 25, "end of report", "_" * 25)
+    print("_" * 25, "end of report", "_" * 25)
 
-descriptives()
 
-def reason_cats():
+def reason_cats(downed_df):
     print(downed_df.reason.unique())
     print("_" * 65)
 
-# reason_cats()
 
-def history_cats():
+def history_cats(history_df):
     print(history_df["downed reason"].unique(), "\n")
     print(history_df["squawk"].unique(), "\n")
     print(history_df["comments"].unique(), "\n")
     print("_" * 65)
 
-# history_cats()
-
-#########################################################################################
-# We need to clean this all up, but I wanted to get it in here so you can check it out.#
-#########################################################################################
 
-downed_df = downed_df.sort_values('downed')
-NOAA_df = NOAA_df.sort_values('DATE')
+@traced("merge.merge_downed_and_NOAA")
+def merge_downed_and_NOAA(downed_df, NOAA_df):
+    downed_df = downed_df.sort_values('downed')
+    NOAA_df = NOAA_df.sort_values('DATE')
 
-def merge_downed_and_NOAA():
     # Merge and assign each downed event the most recent NOAA data before that event
-    # merge_asof is like a left-join but matches on the nearest key rather than the equal keys. 
-    merged_df = pd.merge_asof(
-        downed_df,
-        NOAA_df,
-        left_on='downed',
-        right_on='DATE',
-        direction='backward'
-    )
-    return merged_df
-merged_df = merge_downed_and_NOAA()
-
-
-# There are some rows in merged_df that contain NaNs.
-nan_rows = merged_df[merged_df['avg_temperature_prev_5d'].isna()]
-# print(nan_rows['downed'])
-
-merged_df = merged_df.drop(nan_rows.index)
-
-# The 50 hour, 100 hour, and Annual inspections occur on a schedule, and the Unspecified reasons don't give any indications, so all those can be removed from analysis.
-
-final_merged_df = merged_df.loc[merged_df['reason'].isin(['50 Hr Inspect', '100 Hr Inspect', 'Annual Inspect','Unspecified']) == False]
-
-# Here's the SPLOM.  
-important_cols = [
-    'avg_temperature_prev_5d',
-    'avg_precipitation_prev_5d',
-    'avg_humidity_prev_5d',
-    'avg_wind_speed_prev_5d',
-    'avg_visibility_prev_5d',
+    # point_in_time_join matches on the latest earlier DATE, like merge_asof, and reports the events it can't match
+    with stage("merge.point_in_time_join") as s:
+        merged_df, unmatched_df = point_in_time_join(downed_df, NOAA_df, time_col='downed')
+        s.rows = len(merged_df)
+
+    # There are some events in merged_df without NOAA data, they began before the NOAA data.
+    # print(unmatched_df)
+    return merged_df.drop(unmatched_df['event']).reset_index(drop=True)
+
+
+@traced("merge.final_merge")
+def final_merge(merged_df, excluded=EXCLUDED_REASONS):
+    return merged_df.loc[merged_df['reason'].isin(excluded) == False]
+
+
+def reason_and_aircraft_counts(merged_df):
+    reason_counts = merged_df['reason'].value_counts()
+    print(reason_counts)
+
+    aircraft = merged_df['resource'].value_counts()
+    print("No. aircraft: ", len(aircraft))
+    print(aircraft)
+
+
+# df_A and df_B feed the correlations and aren't needed by the report or the charts; ask for them by name.
+STAGES = [
+    Stage("df_A", NOAA.df_A, files=[NOAA_CSV], modules=CLEANING_MODULES),
+    Stage("df_B", NOAA.df_B, files=[NOAA_CSV], modules=CLEANING_MODULES),
+    Stage("NOAA", NOAA.get_cleaned_NOAA_df, params={"prev_days": 5}, files=[NOAA_CSV], modules=CLEANING_MODULES),
+    Stage("history", history, files=[HISTORY_CSV], modules=("historical_data",) + MAINTENANCE_MODULES),
+    Stage("downed", downed, files=[REASON_CSV],
+          modules=("reason_data", "reason_taxonomy") + MAINTENANCE_MODULES),
+    Stage("descriptives", descriptives, inputs=["history", "downed"], always=True),
+    Stage("merged", merge_downed_and_NOAA, inputs=["downed", "NOAA"], modules=["weather_join"]),
+    Stage("final_merged", final_merge, inputs=["merged"], params={"excluded": EXCLUDED_REASONS}),
+    Stage("splom", draw_charts, inputs=["final_merged", "downed"], params={"names": ["weather_splom"]}, always=True),
+    Stage("charts", draw_charts, inputs=["final_merged", "downed"], always=True),
 ]
 
-def weather_splom(columns):
-    sub_df = final_merged_df[important_cols + ['reason']].dropna()
-    sns.pairplot(
-        sub_df,
-        vars=important_cols,
-        hue='reason',
-        corner=True,
-        plot_kws={'alpha': 0.6}
-    )
-
-    plt.suptitle("SPLOM of NOAA Rolling Averages by Downed Reason", y=1.02)
-    plt.tight_layout()
-    plt.show()
-weather_splom(important_cols)
-
-
-# KDE plot template for weather data in final_merged_df
-def plot_kde_by_reason(x):
-    sub_df = final_merged_df[[x, 'reason']].dropna()
-
-    plt.figure(figsize=(10, 5))
-    sns.kdeplot(
-        data=sub_df,
-        x=x,
-        hue='reason',
-        fill=True,
-        common_norm=False,
-        alpha=0.4,
-        linewidth=1.5,
-        palette='tab10'
-    )
-
-    plt.title(f'Distribution of {x} by Downed Reason')
-    plt.xlabel(x)
-    plt.ylabel('Density')
-    plt.tight_layout()
-    plt.show()
-
-# plot_kde_by_reason('avg_temperature_prev_5d')
-
-
-reason_counts = merged_df['reason'].value_counts()
-# print(reason_counts)
-
-aircraft = merged_df['resource'].value_counts()
-#print("No. aircraft: ", len(aircraft))
-#print(aircraft)
-
-
-# Chart showing how many times each aircraft was downed and for what reason.
-def downed_counts_by_aircraft_and_reason():
-    count_df = final_merged_df.groupby(['resource', 'reason']).size().reset_index(name='count')
-    total_counts = count_df.groupby('resource')['count'].sum().sort_values(ascending=False)
-    count_df['resource'] = pd.Categorical(count_df['resource'], categories=total_counts.index, ordered=True)
-
-    plt.figure(figsize=(10, 8))
-    ax = sns.barplot(
-        data=count_df,
-        y='resource',
-        x='count',
-        hue='reason',
-        palette='tab10'
-    )
-
-    plt.title("Downed Events per Aircraft by Reason")
-    plt.xlabel("Event Count")
-    plt.ylabel("Aircraft (Resource)")
-    plt.legend(title='Reason', bbox_to_anchor=(1.01, 1), loc='upper left')
-    plt.tight_layout()
-    plt.show()
-
-# downed_counts_by_aircraft_and_reason()
-
-# Another plot of the same data, but this one is stacked so it is easier to read.
-def stacked_downed_counts_by_aircraft_and_reason():
-    count_df = final_merged_df.groupby(['resource', 'reason']).size().unstack(fill_value=0)
-    count_df = count_df.loc[count_df.sum(axis=1).sort_values(ascending=False).index]
-
-    plt.figure(figsize=(10, 8))
-    left = pd.Series([0] * len(count_df), index=count_df.index)
-    colors = plt.cm.tab10.colors  
-    for i, reason in enumerate(count_df.columns):
-        counts = count_df[reason]
-        bars = plt.barh(count_df.index, counts, left=left, label=reason, color=colors[i % len(colors)])
-        left += counts
-
-    plt.xlabel("Total Downed Events")
-    plt.ylabel("Aircraft (Resource)")
-    plt.margins(y=0.02)
-    plt.title("Stacked Downed Events per Aircraft by Reason")
-    plt.legend(title='Reason', bbox_to_anchor=(1.01, 1), loc='upper left')
-    plt.xticks(ticks=[0, 5, 10, 15, 20], labels=['0', '5', '10', '15', '20'])
-    plt.tight_layout()
-    plt.show()
-
-# stacked_downed_counts_by_aircraft_and_reason()
-
-
-# Average Downtime Duration per Reason
-def horizontal_bar_seaborn(df):
-    avg_duration = df.groupby('reason')['duration'].mean().reset_index()
-    avg_duration['duration_hours'] = avg_duration['duration'].dt.total_seconds() / 3600
-    
-    plot_data = avg_duration.reset_index()
-    plot_data = plot_data.sort_values('duration_hours', ascending=True)
-
-    plt.figure(figsize=(12, 6))
-    barplot = sns.barplot(
-        data=plot_data,
-        y='reason',
-        x='duration_hours',
-        palette='tab10'
-    )    
-    for i in barplot.containers:
-        barplot.bar_label(i, fmt='%.1f', label_type='edge', padding=3)
-    plt.title('Average Downtime Duration by Reason', fontsize=14)
-    plt.xlabel('Average Duration')
-    plt.ylabel('Reason')
-    plt.tight_layout()
-    return plt.show()
-# horizontal_bar_seaborn(downed_df)
-
 
+if __name__ == "__main__":
+    main(STAGES, ["descriptives", "splom"], description="Clean the NOAA and maintenance data, merge and chart them.")
@@ -0,0 +1,156 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.collections import PolyCollection
+from matplotlib.patches import Patch
+from matplotlib.transforms import AffineDeltaTransform
+
+from binned_kde import kde_curves
+
+# A scatter matrix for any number of events: instead of one marker per event on every panel, each panel shows the
+# counts of a 2-D grid, colored by the mix of groups (reasons) in each cell and more opaque where there are more
+# events. Drawing costs the same for a thousand events as for ten million; only the number of bins matters.
+#   - kind="hist": square bins, each panel drawn as one image
+#   - kind="hex": hexagonal bins on the same lattice as plt.hexbin, drawn as one collection of the occupied cells
+# The counts of every column pair x group come from one bincount over precomputed bin indices. The diagonal shows the
+# per-group density curves from binned_kde. Same corner layout as sns.pairplot(corner=True).
+
+
+def _column_edges(values, bins):
+    lo = np.nanmin(values, axis=0)
+    hi = np.nanmax(values, axis=0)
+    hi = np.where(hi > lo, hi, lo + 1)
+    return np.linspace(lo, hi, bins + 1, axis=1)
+
+
+# The pairs below the diagonal: (row column, x column)
+def lower_pairs(n_columns):
+    rows, cols = np.tril_indices(n_columns, k=-1)
+    return rows, cols
+
+
+# Counts of shape (pairs, groups, bins, bins) indexed [pair, group, x bin, y bin], and the edges of every column
+def pair_histograms(values, codes, n_groups, bins=64):
+    edges = _column_edges(values, bins)
+    width = edges[:, -1] - edges[:, 0]
+    index = np.clip(((values - edges[:, 0]) / width * bins).astype(np.int64), 0, bins - 1)
+
+    rows, cols = lower_pairs(values.shape[1])
+    pair = np.arange(len(rows))[:, None]
+    cells = ((pair * n_groups + codes) * bins + index[:, cols].T) * bins + index[:, rows].T
+    counts = np.bincount(cells.ravel(), minlength=len(rows) * n_groups * bins * bins)
+    return counts.reshape(len(rows), n_groups, bins, bins), edges
+
+
+# Hexagonal bins as in plt.hexbin(gridsize): two offset rectangular lattices, every point goes to the nearer centre.
+# Returns counts (pairs, groups, cells), the centres of every pair's cells (pairs, cells, 2) and the hexagon's size.
+def pair_hexbins(values, codes, n_groups, gridsize=40):
+    nx = gridsize
+    ny = int(nx / np.sqrt(3))
+    lo = np.nanmin(values, axis=0)
+    hi = np.nanmax(values, axis=0)
+    hi = np.where(hi > lo, hi, lo + 1)
+
+    rows, cols = lower_pairs(values.shape[1])
+    sx = (hi[cols] - lo[cols]) / nx
+    sy = (hi[rows] - lo[rows]) / ny
+    ix = (values[:, cols].T - lo[cols, None]) / sx[:, None]
+    iy = (values[:, rows].T - lo[rows, None]) / sy[:, None]
+
+    ix1, iy1 = np.round(ix), np.round(iy)
+    ix2, iy2 = np.floor(ix), np.floor(iy)
+    first = (ix - ix1) ** 2 + 3 * (iy - iy1) ** 2 < (ix - ix2 - 0.5) ** 2 + 3 * (iy - iy2 - 0.5) ** 2
+    n_first = (nx + 1) * (ny + 1)
+    cell = np.where(first, ix1 * (ny + 1) + iy1,
+                    n_first + np.clip(ix2, 0, nx - 1) * ny + np.clip(iy2, 0, ny - 1)).astype(np.int64)
+    n_cells = n_first + nx * ny
+
+    pair = np.arange(len(rows))[:, None]
+    counts = np.bincount(((pair * n_groups + codes) * n_cells + cell).ravel(), minlength=len(rows) * n_groups * n_cells)
+
+    gx1, gy1 = np.divmod(np.arange(n_first), ny + 1)
+    gx2, gy2 = np.divmod(np.arange(nx * ny), ny)
+    grid_x = np.r_[gx1, gx2 + 0.5]
+    grid_y = np.r_[gy1, gy2 + 0.5]
+    centres = np.stack([lo[cols, None] + grid_x * sx[:, None], lo[rows, None] + grid_y * sy[:, None]], axis=-1)
+    return counts.reshape(len(rows), n_groups, n_cells), centres, np.stack([sx, sy], axis=1)
+
+
+# RGBA of every cell: the groups' colors mixed by their counts, opacity growing with the log of the cell's total,
+# scaled per panel. counts has the groups on axis 1.
+def blend(counts, colors, max_alpha=0.9):
+    total = counts.sum(axis=1)
+    rgb = np.einsum("pg...,gc->p...c", counts, np.asarray(colors)) / np.maximum(total, 1)[..., None]
+    peak = np.log1p(total.reshape(len(total), -1).max(axis=1))
+    alpha = np.log1p(total) / np.maximum(peak, 1e-12).reshape((-1,) + (1,) * (total.ndim - 1)) * max_alpha
+    return np.concatenate([rgb, alpha[..., None]], axis=-1)
+
+
+def aggregated_splom(df, columns, hue='reason', kind="hist", bins=64, gridsize=40, palette=None, height=2.5):
+    sub_df = df[columns + [hue]].dropna()
+    codes, groups = pd.factorize(sub_df[hue])
+    values = sub_df[columns].to_numpy(dtype="float64")
+    colors = sns.color_palette(palette, n_colors=len(groups))
+    rows, cols = lower_pairs(len(columns))
+
+    if kind == "hist":
+        counts, edges = pair_histograms(values, codes, len(groups), bins)
+    elif kind == "hex":
+        counts, centres, sizes = pair_hexbins(values, codes, len(groups), gridsize)
+    else:
+        raise ValueError(f"unknown kind {kind!r}, use 'hist' or 'hex'")
+    images = blend(counts, colors)
+    curves = kde_curves(sub_df, columns, by=hue)
+
+    n = len(columns)
+    fig, axes = plt.subplots(n, n, figsize=(height * n, height * n), squeeze=False)
+    lo, hi = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+    for i in range(n):
+        for j in range(i + 1, n):
+            axes[i, j].remove()
+
+    for p, (i, j) in enumerate(zip(rows, cols)):
+        ax = axes[i, j]
+        if kind == "hist":
+            # images[p] is indexed [x bin, y bin]; imshow wants rows of y
+            ax.imshow(images[p].transpose(1, 0, 2), origin="lower", aspect="auto", interpolation="nearest",
+                      extent=(edges[j, 0], edges[j, -1], edges[i, 0], edges[i, -1]))
+        else:
+            occupied = images[p, :, 3] > 0
+            sx, sy = sizes[p]
+            hexagon = np.array([[0.5, -0.5], [0.5, 0.5], [0.0, 1.0], [-0.5, 0.5], [-0.5, -0.5], [0.0, -1.0]])
+            ax.add_collection(PolyCollection([hexagon * [sx, sy / 3]], offsets=centres[p, occupied],
+                                             offset_transform=ax.transData,
+                                             transform=AffineDeltaTransform(ax.transData),
+                                             facecolors=images[p, occupied], edgecolors="face", linewidths=0))
+        ax.set_xlim(lo[j], hi[j])
+        ax.set_ylim(lo[i], hi[i])
+
+    for i, col in enumerate(columns):
+        ax = axes[i, i]
+        column_curves = curves[curves["column"] == col]
+        for group, curve in column_curves.groupby("group", sort=False):
+            color = colors[groups.get_loc(group)]
+            ax.fill_between(curve["x"], 0, curve["density"], color=color, alpha=0.25, linewidth=1)
+            ax.plot(curve["x"], curve["density"], color=color, linewidth=1)
+        ax.set_xlim(lo[i], hi[i])
+        ax.set_ylim(bottom=0)
+        ax.set_yticks([])
+
+    for i, col in enumerate(columns):
+        axes[-1, i].set_xlabel(col)
+        if i > 0:
+            axes[i, 0].set_ylabel(col)
+        for j in range(i + 1):
+            if i < n - 1:
+                axes[i, j].tick_params(labelbottom=False)
+            if j > 0:
+                axes[i, j].tick_params(labelleft=False)
+    for ax in axes.flat:
+        ax.spines["top"].set_visible(False)
+        ax.spines["right"].set_visible(False)
+
+    handles = [Patch(color=colors[k], label=group) for k, group in enumerate(groups)]
+    fig.legend(handles=handles, title=hue, loc="center right", bbox_to_anchor=(0.98, 0.6), frameon=False)
+    return fig
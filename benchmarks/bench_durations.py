@@ -0,0 +1,65 @@
+# Compare parse_durations with the per-row regex parsing historical_data used to do,
+# on synthetic maintenance exports of a few million rows.
+# Run from the repository root:  python -m benchmarks.bench_durations --rows 2000000
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from durations import parse_durations
+
+
+# Durations in the layouts of both exports: "HHHH:MM:SS" / "H:MM" and comma-grouped decimal hours
+def synthetic_durations(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    minutes = rng.exponential(24 * 60, rows).astype(np.int64)
+    hours, mins = minutes // 60, minutes % 60
+    clock = np.where(hours < 24,
+                     pd.Series(hours).astype(str) + ":" + pd.Series(mins).astype(str).str.zfill(2),
+                     pd.Series(hours).astype(str) + ":" + pd.Series(mins).astype(str).str.zfill(2) + ":00")
+    decimal = pd.Series(minutes / 60).map("{:,.2f}".format)
+    return pd.Series(clock), decimal
+
+
+# The old approach: up to three re.match calls and a pd.to_timedelta per row
+def per_row(val):
+    try:
+        val = val.strip()
+        if re.match(r"^\d+:\d{2}:\d{2}(\.\d+)?$", val):
+            return pd.to_timedelta(val)
+        if re.match(r"^\d+:\d{2}$", val):
+            hours, mins = map(int, val.split(":"))
+            return pd.Timedelta(hours=hours, minutes=mins)
+    except Exception:
+        return np.nan
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare parse_durations with per-row duration parsing.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--per-row-rows", type=int, default=200_000,
+                        help="the per-row path is timed on fewer rows and scaled up")
+    args = parser.parse_args()
+
+    clock, decimal = synthetic_durations(args.rows)
+    sample = clock.iloc[:args.per_row_rows]
+    row_time = timed(lambda s: s.apply(per_row), sample) * args.rows / len(sample)
+    clock_time = timed(parse_durations, clock)
+    decimal_time = timed(parse_durations, decimal, "hours")
+
+    print(f"{args.rows:,} durations")
+    print(f"per-row regex (scaled):        {row_time:8.2f} s")
+    print(f"parse_durations clock format:  {clock_time:8.2f} s  ({row_time / clock_time:.1f}x)")
+    print(f"parse_durations decimal hours: {decimal_time:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Time EventIndex queries against a str.contains scan on a synthetic multi-year, multi-fleet event log.
+# The real events are copied into other years and other fleets.
+# Run from the repository root:  python -m benchmarks.bench_event_index --years 10 --fleets 20
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from downtime_events import build_events
+from event_index import EventIndex
+
+QUERIES = [('"boost pump"', "F00U31"), ("mag*", None), ("oil pressure", "N1281"), ('"timed out"', None)]
+
+
+def synthetic_events(years, fleets):
+    events = build_events()
+    copies = []
+    for year in range(years):
+        for fleet in range(fleets):
+            copy = events.copy()
+            copy["downed"] = copy["downed"] + pd.DateOffset(years=year)
+            copy["upped"] = copy["upped"] + pd.DateOffset(years=year)
+            copy["resource"] = copy["resource"].astype(str).str.replace("WMU", f"F{fleet:02d}U", regex=False)
+            copies.append(copy)
+    events = pd.concat(copies, ignore_index=True)
+    return events.astype({"resource": "category", "reg": "category"})
+
+
+def scan(events, query, tail, start, end):
+    phrase = query.strip('"').rstrip("*")
+    text = events["comments"].fillna("") + " " + events["squawk"].fillna("") + " " + events["downed reason"].astype(str)
+    mask = text.str.contains(phrase, case=False, regex=False)
+    mask &= (events["downed"] >= start) & (events["downed"] < end)
+    if tail is not None:
+        mask &= events["resource"].astype(str).str.contains(tail, regex=False)
+    return np.flatnonzero(mask)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare EventIndex queries with a str.contains scan.")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--fleets", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    events = synthetic_events(args.years, args.fleets)
+    start_time = time.perf_counter()
+    index = EventIndex.build(events)
+    build_time = time.perf_counter() - start_time
+    print(f"{len(events):,} events, {len(index.vocabulary):,} terms, index built in {build_time:.2f} s")
+
+    start, end = pd.Timestamp("2026-07-01"), pd.Timestamp("2026-10-01")
+    for query, tail in QUERIES:
+        start_time = time.perf_counter()
+        for _ in range(args.repeat):
+            rows = index.match(query, tail, start, end)
+        index_time = (time.perf_counter() - start_time) / args.repeat
+
+        start_time = time.perf_counter()
+        scan(index.events, query, tail, start, end)
+        scan_time = time.perf_counter() - start_time
+        print(f"{query:16} tail={str(tail):7} {len(rows):6} events  index {index_time * 1e3:7.3f} ms"
+              f"  str.contains scan {scan_time * 1e3:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
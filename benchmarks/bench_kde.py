@@ -0,0 +1,72 @@
+# Compare binned_kde.compute_kde_curves with seaborn's KDE (scipy's gaussian_kde, as sns.kdeplot evaluates it) on
+# synthetic events: every weather column x reason curve, and the largest difference between the two.
+# Run from the repository root:  python -m benchmarks.bench_kde --events 200000 --reasons 12
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from seaborn._statistics import KDE
+
+from binned_kde import compute_kde_curves
+
+COLUMNS = ["avg_temperature_prev_5d", "avg_precipitation_prev_5d", "avg_humidity_prev_5d", "avg_wind_speed_prev_5d",
+           "avg_visibility_prev_5d", "avg_dew_point_prev_5d", "avg_pressure_prev_5d", "avg_gust_speed_prev_5d",
+           "avg_wind_direction_prev_5d"]
+
+
+# Skewed, differently scaled columns with some missing values, and reasons of very different sizes
+def synthetic_events(events, reasons, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = rng.pareto(1.5, reasons) + 0.05
+    df = pd.DataFrame({"reason": rng.choice([f"Reason {i}" for i in range(reasons)], events, p=weights / weights.sum())})
+    for i, col in enumerate(COLUMNS):
+        values = rng.gamma(2 + i, 3 + i, events) - 10 * i
+        values[rng.random(events) < 0.02] = np.nan
+        df[col] = values
+    return df
+
+
+def seaborn_curves(df, columns, by="reason"):
+    out = {}
+    for col in columns:
+        for group, sub in df[[col, by]].dropna().groupby(by, sort=False):
+            x = sub[col].to_numpy()
+            if len(x) < 2 or x.std() == 0:
+                continue
+            density, support = KDE()(x)
+            out[col, group] = (support, density)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare binned KDE curves with seaborn's KDE.")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--reasons", type=int, default=12)
+    args = parser.parse_args()
+
+    df = synthetic_events(args.events, args.reasons)
+
+    start = time.perf_counter()
+    expected = seaborn_curves(df, COLUMNS)
+    seaborn_time = time.perf_counter() - start
+    start = time.perf_counter()
+    curves = compute_kde_curves(df, COLUMNS)
+    binned_time = time.perf_counter() - start
+
+    worst = 0.0
+    for (col, group), curve in curves.groupby(["column", "group"], sort=False):
+        support, density = expected[col, group]
+        if not np.allclose(curve["x"].to_numpy(), support):
+            raise SystemExit(f"support of {col} / {group} differs from seaborn's")
+        worst = max(worst, np.abs(curve["density"].to_numpy() - density).max() / density.max())
+    if len(expected) != curves.groupby(["column", "group"]).ngroups:
+        raise SystemExit("binned_kde and seaborn drew different sets of curves")
+
+    print(f"{args.events:,} events, {len(expected)} curves, largest difference {worst:.1e} of the curve's peak")
+    print(f"seaborn / gaussian_kde:  {seaborn_time:8.2f} s")
+    print(f"compute_kde_curves:      {binned_time:8.2f} s  ({seaborn_time / binned_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Compare the per-row decode_metar path with the whole-column decode_metar_frame.
+# Run from the repository root:  python -m benchmarks.bench_metar --rows 1000000
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from NOAA import NOAALoader, decode_metar
+from metar import decode_metar_frame
+
+
+# Resample the real Battle Creek reports up to the requested number of rows.
+def sample_reports(rows, seed=0):
+    reports = NOAALoader().raw()["REM"].dropna().to_numpy()
+    picks = np.random.default_rng(seed).integers(0, len(reports), rows)
+    return pd.Series(reports[picks])
+
+
+def per_row(reports):
+    decoded = reports.apply(decode_metar)
+    return pd.json_normalize(decoded.tolist())
+
+
+def timed(func, reports):
+    start = time.perf_counter()
+    func(reports)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row and whole-column METAR decoding.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    reports = sample_reports(args.rows)
+    row_time = timed(per_row, reports)
+    column_time = timed(decode_metar_frame, reports)
+
+    print(f"{args.rows:,} METARs")
+    print(f"per-row decode_metar:    {row_time:8.2f} s  ({args.rows / row_time:12,.0f} reports/s)")
+    print(f"decode_metar_frame:      {column_time:8.2f} s  ({args.rows / column_time:12,.0f} reports/s)")
+    print(f"speedup:                 {row_time / column_time:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# Time and memory-profile every stage of the analysis, from the LCD csv and the maintenance exports to the charts,
+# on synthetic inputs at several scales (benchmarks/synthetic_data.py: scale k is k station-years of weather and
+# k times the maintenance events).
+# Each scale runs twice on fresh loaders: once for wall and CPU time, once under tracemalloc for the peak memory
+# allocated by each stage, so the tracing doesn't slow the timings. Stages run in order and reuse earlier results,
+# the way NOAALoader and the maintenance data do, so every row is the cost of that stage alone.
+# The results go to a json file; --compare prints the ratio to an earlier one.
+# Run from the repository root:
+#   python -m benchmarks.bench_pipeline --scales 1 10 100
+#   python -m benchmarks.bench_pipeline --scales 1 10 --compare benchmarks/results/pipeline-20261018-120000.json
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import binned_kde  # noqa: E402
+import NOAA  # noqa: E402
+from benchmarks.synthetic_data import write_lcd_csv, write_maintenance_exports  # noqa: E402
+from charts import CATALOG  # noqa: E402
+from historical_data import history  # noqa: E402
+from maintenance_data import maintenance  # noqa: E402
+from reason_data import downed  # noqa: E402
+from WMU_NOAA_Analysis import final_merge, merge_downed_and_NOAA  # noqa: E402
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+
+def _render(chart, df):
+    fig = chart.func(df, **chart.params)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=100)
+    plt.close(fig)
+    return buffer.tell()
+
+
+# (name, function of the loader and the results so far), in order
+def stages():
+    out = [
+        ("read_lcd", lambda loader, r: loader.raw()),
+        ("decode_metar (per row)", lambda loader, r: r["read_lcd"]["REM"].map(NOAA.decode_metar)),
+        ("df_A", lambda loader, r: loader.df_A()),
+        ("df_B (decode_metar_frame)", lambda loader, r: loader.df_B()),
+        ("parse_metar_reports", lambda loader, r: loader.metar()),
+        ("NOAA_to_float_and_interpolate", lambda loader, r: loader.NOAA_to_float_and_interpolate()),
+        ("get_cleaned_NOAA_df", lambda loader, r: loader.get_cleaned_NOAA_df()),
+        ("get_NOAA_features", lambda loader, r: loader.get_NOAA_features()),
+        ("history", lambda loader, r: history()),
+        ("downed", lambda loader, r: downed()),
+        ("merge_downed_and_NOAA", lambda loader, r: merge_downed_and_NOAA(r["downed"], r["get_cleaned_NOAA_df"])),
+        ("final_merge", lambda loader, r: final_merge(r["merge_downed_and_NOAA"])),
+    ]
+    for name, chart in CATALOG.items():
+        data = "final_merge" if chart.data == "final_merged" else chart.data
+        out.append((f"chart {name}", lambda loader, r, chart=chart, data=data: _render(chart, r[data])))
+    return out
+
+
+def _rows(result):
+    return len(result) if isinstance(result, (pd.DataFrame, pd.Series)) else None
+
+
+def run_stages(lcd_path, skip, memory):
+    maintenance.clear()
+    loader = NOAA.NOAALoader(lcd_path)
+    results, records = {}, []
+    for name, func in stages():
+        if name in skip:
+            continue
+        if memory:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            results[name] = func(loader, results)
+            current, peak = tracemalloc.get_traced_memory()
+            records.append({"stage": name, "peak_bytes": peak - before, "retained_bytes": current - before})
+        else:
+            wall, cpu = time.perf_counter(), time.process_time()
+            results[name] = func(loader, results)
+            records.append({"stage": name, "seconds": time.perf_counter() - wall,
+                            "cpu_seconds": time.process_time() - cpu, "rows": _rows(results[name])})
+    return records
+
+
+def run_scale(scale, directory, skip, memory, seed):
+    lcd_path = os.path.join(directory, f"lcd_{scale}x.csv")
+    history_path = os.path.join(directory, f"history_{scale}x.csv")
+    reason_path = os.path.join(directory, f"reason_{scale}x.csv")
+    start = time.perf_counter()
+    write_lcd_csv(lcd_path, scale, seed=seed)
+    write_maintenance_exports(history_path, reason_path, scale, seed=seed)
+    print(f"scale {scale}x: wrote {os.path.getsize(lcd_path) / 1024 ** 2:.0f} MB of LCD csv in "
+          f"{time.perf_counter() - start:.1f} s")
+
+    # history() and downed() read through the shared maintenance data; point it at the synthetic exports
+    saved = maintenance.history_path, maintenance.reason_path
+    maintenance.history_path, maintenance.reason_path = history_path, reason_path
+    try:
+        records = run_stages(lcd_path, skip, memory=False)
+        if memory:
+            tracemalloc.start()
+            try:
+                for record, traced in zip(records, run_stages(lcd_path, skip, memory=True)):
+                    record.update(traced)
+            finally:
+                tracemalloc.stop()
+    finally:
+        maintenance.history_path, maintenance.reason_path = saved
+        maintenance.clear()
+
+    for record in records:
+        record["scale"] = scale
+    return records
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {"created": pd.Timestamp.now().isoformat(timespec="seconds"), "commit": commit,
+            "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+            "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def report(results, previous=None):
+    df = pd.DataFrame(results).astype({"rows": "Int64"})
+    columns = ["scale", "stage", "seconds", "cpu_seconds", "rows"]
+    if "peak_bytes" in df:
+        df["peak MB"] = df["peak_bytes"] / 1024 ** 2
+        columns.append("peak MB")
+    if previous is not None:
+        before = pd.DataFrame(previous["results"]).set_index(["scale", "stage"])["seconds"]
+        df["x previous"] = df["seconds"] / df.set_index(["scale", "stage"]).index.map(before)
+        columns.append("x previous")
+    print(df[columns].to_string(index=False, float_format="%.3f"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile every stage of the pipeline.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--skip", nargs="*", default=[], metavar="STAGE", help="stages to leave out")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help=f"json file to write (default: {RESULTS_DIR}/pipeline-<time>.json)")
+    parser.add_argument("--compare", help="an earlier results file to compare the times with")
+    parser.add_argument("--data-dir", help="where to write the synthetic inputs (default: a temporary directory)")
+    args = parser.parse_args()
+
+    # Keep the KDE curves of the charts out of the shared disk cache, so every run computes them
+    saved_cache = binned_kde.KDE_CACHE.directory
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.data_dir or tmp
+        os.makedirs(directory, exist_ok=True)
+        binned_kde.KDE_CACHE.directory = os.path.join(tmp, "kde_cache")
+        try:
+            for scale in args.scales:
+                results.extend(run_scale(scale, directory, set(args.skip), not args.no_memory, args.seed))
+        finally:
+            binned_kde.KDE_CACHE.directory = saved_cache
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{pd.Timestamp.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({"environment": environment(), "scales": args.scales, "results": results}, f, indent=1)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    report(results, previous)
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
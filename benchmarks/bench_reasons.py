@@ -0,0 +1,55 @@
+# Check reason_classifier against reason_data.map_reason and compare their speed on a synthetic column.
+# Run from the repository root:  python -m benchmarks.bench_reasons --rows 5000000
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from maintenance_data import maintenance
+from reason_data import combine_reason, map_reason
+from reason_taxonomy import reason_classifier
+
+
+# Reason texts in the shape of the export, including combinations, other casing and unknown reasons
+def synthetic_reasons(df, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    known = combine_reason(df["downed reason"], df["eta squawk"]).unique().tolist()
+    extra = ["AIRFRAME DAMAGE", "engine airframe", "propeller Hangar", "Unknown", "", "Squawk annual inspect"]
+    vocabulary = np.array(known + extra, dtype=object)
+    return pd.Series(vocabulary[rng.integers(0, len(vocabulary), rows)])
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare reason_classifier with map_reason.")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--per-row-rows", type=int, default=500_000,
+                        help="map_reason is timed on fewer rows and scaled up")
+    args = parser.parse_args()
+
+    df = maintenance.reason_export()
+    exported = combine_reason(df["downed reason"], df["eta squawk"])
+    if not (reason_classifier.classify(exported).astype(str) == exported.map(map_reason)).all():
+        raise SystemExit("reason_classifier disagrees with map_reason on the export")
+
+    reasons = synthetic_reasons(df, args.rows)
+    sample = reasons.iloc[:args.per_row_rows]
+    expected, row_time = timed(lambda s: s.map(map_reason), sample)
+    labels, column_time = timed(reason_classifier.classify, reasons)
+    if not (labels.iloc[:len(sample)].astype(str) == expected).all():
+        raise SystemExit("reason_classifier disagrees with map_reason on the synthetic reasons")
+
+    row_time *= args.rows / len(sample)
+    print(f"{args.rows:,} reasons, labels match map_reason")
+    print(f"map_reason per row (scaled): {row_time:8.2f} s")
+    print(f"reason_classifier.classify:  {column_time:8.2f} s  ({row_time / column_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
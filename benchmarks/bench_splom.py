@@ -0,0 +1,56 @@
+# Time weather_splom drawing every event (sns.pairplot) against the aggregated histogram and hexbin panels, rendered to
+# png, as the number of events grows. pairplot is skipped past --max-points-events.
+# Run from the repository root:  python -m benchmarks.bench_splom --events 1000 10000 100000 1000000
+import argparse
+import io
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from binned_kde import kde_curves  # noqa: E402
+from charts import important_cols, weather_splom  # noqa: E402
+
+
+def synthetic_events(events, reasons=8, seed=0):
+    rng = np.random.default_rng(seed)
+    scales = np.array([15, 0.02, 10, 4, 1.5])
+    centres = np.array([50, 0.01, 70, 8, 9])
+    df = pd.DataFrame(rng.normal(size=(events, len(important_cols))) * scales + centres, columns=important_cols)
+    df["reason"] = rng.choice([f"Reason {i}" for i in range(reasons)], events)
+    return df
+
+
+def render(df, mode):
+    start = time.perf_counter()
+    fig = weather_splom(df, mode=mode)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=100)
+    plt.close(fig)
+    return time.perf_counter() - start, buffer.tell()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare point and aggregated SPLOM rendering times.")
+    parser.add_argument("--events", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-points-events", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'events':>10} {'mode':>7} {'seconds':>8} {'png KB':>8}")
+    for events in args.events:
+        df = synthetic_events(events)
+        # The diagonal's density curves are cached on disk; compute them first so every mode is timed without them
+        kde_curves(df, important_cols)
+        for mode in ("points", "hist", "hex"):
+            if mode == "points" and events > args.max_points_events:
+                continue
+            seconds, size = render(df, mode)
+            print(f"{events:>10,} {mode:>7} {seconds:8.2f} {size / 1024:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
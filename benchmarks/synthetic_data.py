@@ -0,0 +1,95 @@
+# Seeded synthetic inputs in the layouts of the real files, at any number of years.
+#   - write_lcd_csv: the LCD export of NOAA_CSV, every column of it, repeated year after year. FM-15/FM-16 reports,
+#     SOD and SOM rows and the METAR REM strings (with their MET prefix dated in the new year) all come along, and the
+#     temperature, dew point, humidity, wind and altimeter readings are jittered so no two years are the same.
+#   - write_maintenance_exports: both maintenance exports repeated in the same way, the events of every copy moved a
+#     year later and up to an hour and a half either way. The sold aircraft stays the first row, once, as in the
+#     real exports.
+# Scale k is k years of weather and k times the events of the real exports.
+import numpy as np
+import pandas as pd
+
+from maintenance_data import HISTORY_CSV, REASON_CSV
+from NOAA import NOAA_CSV
+
+LCD_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+# column: (standard deviation of the jitter, decimals, lowest, highest)
+JITTER = {
+    "HourlyDryBulbTemperature": (2.0, 0, -40, 110),
+    "HourlyDewPointTemperature": (2.0, 0, -50, 90),
+    "HourlyRelativeHumidity": (4.0, 0, 1, 100),
+    "HourlyWindSpeed": (1.5, 0, 0, 60),
+    "HourlyAltimeterSetting": (0.03, 2, 28.5, 31.5),
+}
+
+
+def _shift_years(stamps, years):
+    return stamps + pd.DateOffset(years=years)
+
+
+# Plain numbers get noise and keep their format; flagged values ("0.02s", "T", "VRB", "*") are left as they are
+def _jitter(values, rng, sd, decimals, lo, hi):
+    numbers = pd.to_numeric(values, errors="coerce")
+    plain = numbers.notna() & values.str.fullmatch(r"-?\d+(?:\.\d+)?").fillna(False)
+    noisy = np.clip(np.round(numbers[plain] + rng.normal(0, sd, plain.sum()), decimals), lo, hi)
+    out = values.copy()
+    out[plain] = noisy.map(f"{{:.{decimals}f}}".format)
+    return out
+
+
+def _lcd_year(template, year_offset, rng):
+    df = template.copy()
+    dates = _shift_years(pd.to_datetime(template["DATE"], format=LCD_DATE_FORMAT), year_offset)
+    df["DATE"] = dates.dt.strftime(LCD_DATE_FORMAT)
+
+    # "MET09601/01/24 00:19:02 SPECI ..." carries the local date; keep it in step with DATE
+    prefix = df["REM"].str.match(r"MET\d{3}\d{2}/\d{2}/\d{2} ").fillna(False)
+    df.loc[prefix, "REM"] = (df.loc[prefix, "REM"].str[:6] + dates[prefix].dt.strftime("%m/%d/%y")
+                             + df.loc[prefix, "REM"].str[14:])
+    if year_offset:
+        for col, (sd, decimals, lo, hi) in JITTER.items():
+            df[col] = _jitter(df[col], rng, sd, decimals, lo, hi)
+    return df
+
+
+def write_lcd_csv(path, years, source=NOAA_CSV, seed=0):
+    template = pd.read_csv(source, dtype=str, keep_default_na=False)
+    # The real header has REPORT_TYPE and SOURCE twice; pandas renamed the second ones
+    header = [col.split(".")[0] for col in template.columns]
+    rng = np.random.default_rng(seed)
+    for year in range(years):
+        _lcd_year(template, year, rng).to_csv(path, mode="w" if year == 0 else "a", index=False,
+                                              header=header if year == 0 else False)
+    return path
+
+
+def _export_dates(values, years, minutes):
+    stamps = pd.to_datetime(values.replace("", None), format="%m/%d/%Y %H:%M")
+    shifted = _shift_years(stamps, years) + pd.to_timedelta(minutes, unit="min")
+    text = (shifted.dt.month.astype("Int64").astype(str) + "/" + shifted.dt.day.astype("Int64").astype(str) + "/"
+            + shifted.dt.year.astype("Int64").astype(str) + " " + shifted.dt.hour.astype("Int64").astype(str) + ":"
+            + shifted.dt.strftime("%M"))
+    return text.where(stamps.notna(), "")
+
+
+def _repeat_export(path, out, years, rng):
+    template = pd.read_csv(path, dtype=str, keep_default_na=False)
+    copies = [template]
+    for year in range(1, years):
+        copy = template.iloc[1:].copy()
+        minutes = rng.integers(-90, 91, len(copy))
+        copy["downed"] = _export_dates(copy["downed"], year, minutes)
+        copy["upped"] = _export_dates(copy["upped"], year, minutes)
+        copies.append(copy)
+    df = pd.concat(copies, ignore_index=True)
+    df.columns = ["" if col.startswith("Unnamed:") else col for col in df.columns]
+    df.to_csv(out, index=False)
+    return out
+
+
+def write_maintenance_exports(history_out, reason_out, years, history_path=HISTORY_CSV, reason_path=REASON_CSV,
+                              seed=0):
+    rng = np.random.default_rng(seed)
+    return (_repeat_export(history_path, history_out, years, rng),
+            _repeat_export(reason_path, reason_out, years, rng))
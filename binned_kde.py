@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from disk_cache import DiskCache, code_fingerprint
+
+# Gaussian kernel density curves of many columns x groups at once, e.g. every avg_* weather column per downed reason.
+# Same curves as sns.kdeplot(..., hue=by, common_norm=False) draws: Scott's bandwidth (scipy's gaussian_kde default)
+# times bw_adjust, each group evaluated on its own grid of gridsize points from min - cut * bw to max + cut * bw.
+#
+# Instead of summing one Gaussian per observation at every grid point (O(n x gridsize) per curve), each column gets one
+# fine grid wide enough for all of its groups. Every observation is split between its two nearest grid points
+# (linear binning), all the column x group histograms are built with one bincount, smoothed together with one FFT
+# (the Gaussian's transform is known, so it is a multiplication per group bandwidth) and read back on each group's own
+# grid by linear interpolation. The cost is O(n + bins log bins) per curve, whatever the number of observations.
+# Groups with fewer than two observations or no spread get no curve, as in seaborn.
+#
+# The result is a long frame: column, group, x, density, with gridsize rows per curve in order.
+# kde_curves caches it on disk under a hash of the data, parameters and code, so every chart drawing the same
+# curves (plot_kde_by_reason, plot_kde_grid) computes them once.
+
+CURVE_COLUMNS = ["column", "group", "x", "density"]
+
+# Fine grid points per column. With the grid spanning data +- (cut + 1) bandwidths, the binning error is far below
+# what shows on a chart.
+BINS = 4096
+
+# Its own directory, so the curves never take space from (or evict) the NOAA stages in .noaa_cache
+KDE_CACHE_DIR = ".kde_cache"
+KDE_CACHE = DiskCache(KDE_CACHE_DIR)
+
+
+# Bandwidth and observation count of every group of every column: arrays of shape (columns, groups)
+def scott_bandwidths(values, codes, n_groups, bw_adjust=1):
+    counts, bandwidths = [], []
+    for column in values.T:
+        valid = ~np.isnan(column)
+        n = np.bincount(codes[valid], minlength=n_groups)
+        total = np.bincount(codes[valid], column[valid], minlength=n_groups)
+        mean = np.divide(total, n, out=np.zeros(n_groups), where=n > 0)
+        squares = np.bincount(codes[valid], (column[valid] - mean[codes[valid]]) ** 2, minlength=n_groups)
+        std = np.sqrt(np.divide(squares, n - 1, out=np.zeros(n_groups), where=n > 1))
+        counts.append(n)
+        bandwidths.append(std * np.power(np.maximum(n, 1), -0.2) * bw_adjust)
+    return np.array(counts), np.array(bandwidths)
+
+
+def compute_kde_curves(df, columns, by="reason", gridsize=200, cut=3, bw_adjust=1, bins=BINS):
+    codes, groups = pd.factorize(df[by])
+    keep = codes >= 0
+    codes = codes[keep]
+    values = df.loc[keep, columns].to_numpy(dtype="float64")
+    n_columns, n_groups = len(columns), len(groups)
+
+    counts, bw = scott_bandwidths(values, codes, n_groups, bw_adjust)
+    has_curve = (counts > 1) & (bw > 0)
+
+    # Per column and group: data range. Per column: one fine grid covering every group's support, plus a bandwidth
+    # so the curves read back at the ends of the supports are inside it.
+    lows = np.full((n_columns, n_groups), np.inf)
+    highs = np.full((n_columns, n_groups), -np.inf)
+    for i in range(n_columns):
+        valid = ~np.isnan(values[:, i])
+        np.minimum.at(lows[i], codes[valid], values[valid, i])
+        np.maximum.at(highs[i], codes[valid], values[valid, i])
+    support_lo = np.where(has_curve, lows - cut * bw, np.inf)
+    support_hi = np.where(has_curve, highs + cut * bw, -np.inf)
+    pad = np.where(has_curve, bw, 0).max(axis=1, initial=0)
+    grid_lo = support_lo.min(axis=1, initial=np.inf) - pad
+    grid_hi = support_hi.max(axis=1, initial=-np.inf) + pad
+    usable = np.isfinite(grid_lo) & np.isfinite(grid_hi)
+    grid_lo = np.where(usable, grid_lo, 0)
+    step = np.where(usable, (grid_hi - grid_lo) / (bins - 1), 1)
+
+    # Linear binning of every observation of every column into row column * n_groups + group
+    column_index = np.broadcast_to(np.arange(n_columns), values.shape)
+    valid = ~np.isnan(values) & has_curve[column_index, codes[:, None]]
+    col = column_index[valid]
+    position = (values[valid] - grid_lo[col]) / step[col]
+    left = np.clip(np.floor(position).astype(np.int64), 0, bins - 2)
+    fraction = position - left
+    row = col * n_groups + np.broadcast_to(codes[:, None], values.shape)[valid]
+    histograms = (np.bincount(row * bins + left, 1 - fraction, minlength=n_columns * n_groups * bins)
+                  + np.bincount(row * bins + left + 1, fraction, minlength=n_columns * n_groups * bins))
+    histograms = histograms.reshape(n_columns * n_groups, bins)
+
+    # Convolve with each row's Gaussian: multiply by its transform, exp(-(2 pi f h)^2 / 2).
+    # Zero padding to twice the grid keeps the tails from wrapping around.
+    frequencies = np.fft.rfftfreq(2 * bins)
+    sigma = (bw / step[:, None]).reshape(-1, 1)
+    kernel = np.exp(-0.5 * (2 * np.pi * frequencies * sigma) ** 2)
+    n = counts.reshape(-1, 1)
+    smoothed = np.fft.irfft(np.fft.rfft(histograms, n=2 * bins, axis=1) * kernel, n=2 * bins, axis=1)[:, :bins]
+    density = smoothed / np.maximum(n, 1) / step.repeat(n_groups)[:, None]
+
+    # Read every curve back on its own grid of gridsize points
+    pairs = np.flatnonzero(has_curve.ravel())
+    pair_column, pair_group = np.divmod(pairs, n_groups)
+    x = np.linspace(support_lo.ravel()[pairs], support_hi.ravel()[pairs], gridsize, axis=1)
+    position = (x - grid_lo[pair_column, None]) / step[pair_column, None]
+    left = np.clip(np.floor(position).astype(np.int64), 0, bins - 2)
+    fraction = position - left
+    curves = density[pairs[:, None], left] * (1 - fraction) + density[pairs[:, None], left + 1] * fraction
+
+    return pd.DataFrame({
+        "column": np.repeat(np.asarray(columns, dtype=object)[pair_column], gridsize),
+        "group": np.repeat(np.asarray(groups, dtype=object)[pair_group], gridsize),
+        "x": x.ravel(),
+        "density": np.maximum(curves, 0).ravel(),
+    }, columns=CURVE_COLUMNS)
+
+
+def kde_curves(df, columns, by="reason", gridsize=200, cut=3, bw_adjust=1, bins=BINS, cache=KDE_CACHE):
+    if cache is None:
+        return compute_kde_curves(df, columns, by, gridsize, cut, bw_adjust, bins)
+
+    data = df[list(columns) + [by]]
+    key = cache.key("kde", list(columns), by, gridsize, cut, bw_adjust, bins,
+                    pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes(), code_fingerprint(__name__))
+    curves = cache.get(key)
+    if curves is None:
+        curves = compute_kde_curves(df, columns, by, gridsize, cut, bw_adjust, bins)
+        cache.put(key, curves)
+    return curves
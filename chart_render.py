@@ -0,0 +1,103 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from disk_cache import DiskCache, code_fingerprint
+
+# Render a catalog of charts to image files without a display.
+# A catalog maps a chart name to a Chart: a function that takes a DataFrame (plus parameters) and returns a
+# matplotlib figure, and the name of the frame it draws from. render_charts() draws every chart, or the ones asked
+# for, on the Agg backend in a pool of processes and saves each one as <directory>/<name>.<format>.
+# The key of every chart (a hash of its frame's contents, its parameters and the code of the module it is defined
+# in plus the modules it lists, like pipeline.Stage) is kept in a manifest in the directory.
+# The workers are spawned, not forked: render_charts runs inside the pipeline's thread pool, and forking a process
+# with other threads running can deadlock the child. A chart whose key matches and whose file is still there is skipped.
+
+MANIFEST = ".render_manifest.json"
+
+
+class Chart:
+    def __init__(self, func, data, params=None, modules=(), dpi=300, format="png"):
+        self.func = func
+        self.data = data
+        self.params = params or {}
+        # Modules the chart calls into besides its own; editing any of them renders it again
+        self.modules = list(modules)
+        self.dpi = dpi
+        self.format = format
+
+
+def frame_hash(df):
+    return DiskCache.key(list(map(str, df.columns)), list(map(str, df.dtypes)),
+                         pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+
+def _headless():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render(chart, df, path):
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    fig = chart.func(df, **chart.params)
+    fig.savefig(path, dpi=chart.dpi, bbox_inches="tight")
+    plt.close(fig)
+    return time.perf_counter() - start
+
+
+def read_manifest(directory):
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# frames maps the data names used by the catalog to DataFrames. Returns a frame of chart, status
+# (rendered / unchanged) and seconds.
+def render_charts(catalog, frames, directory, names=None, force=False, max_workers=None):
+    names = list(catalog) if names is None else list(names)
+    unknown = [name for name in names if name not in catalog]
+    if unknown:
+        raise KeyError(f"Unknown charts: {', '.join(unknown)}")
+
+    os.makedirs(directory, exist_ok=True)
+    manifest = read_manifest(directory)
+    hashes = {data: frame_hash(frames[data]) for data in {catalog[name].data for name in names}}
+
+    keys, paths, todo = {}, {}, []
+    for name in names:
+        chart = catalog[name]
+        keys[name] = DiskCache.key(name, hashes[chart.data], sorted(chart.params.items()), chart.dpi,
+                                   code_fingerprint(chart.func.__module__, *chart.modules))
+        paths[name] = os.path.join(directory, f"{name}.{chart.format}")
+        if force or manifest.get(name) != keys[name] or not os.path.exists(paths[name]):
+            todo.append(name)
+
+    report = {name: ("unchanged", 0.0) for name in names}
+    if todo:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_headless,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(_render, catalog[name], frames[catalog[name].data], paths[name]): name
+                       for name in todo}
+            for future in as_completed(futures):
+                name = futures[future]
+                report[name] = ("rendered", future.result())
+                manifest[name] = keys[name]
+                write_manifest(directory, manifest)
+
+    return pd.DataFrame([(name, *report[name]) for name in names], columns=["chart", "status", "seconds"])
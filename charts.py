@@ -0,0 +1,299 @@
+import argparse
+
+import matplotlib.patches as mpatches
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+from matplotlib.colors import to_rgba
+
+from aggregated_splom import aggregated_splom
+from binned_kde import kde_curves
+from chart_render import Chart, render_charts
+
+# Every chart of the analysis, as a function of the frame it draws and returning its figure, so they can be
+# rendered without a display and in any order. Most of them are the charts of Analyze_NOAA_and_downed.py, which
+# renders them from here, and draw the merged and filtered events (final_merged in WMU_NOAA_Analysis.STAGES);
+# weather_splom and average_duration_by_reason come from WMU_NOAA_Analysis.py.
+#
+# Render the catalog, or some of it, to Charts/ with
+#   python charts.py                                  every chart
+#   python charts.py kde_grid downtime_barchart --out slides --workers 4
+#   python charts.py --list
+# Charts whose data, parameters and code haven't changed since they were last rendered into the directory are skipped.
+
+CHART_DIR = "Charts"
+
+important_cols = [
+    'avg_temperature_prev_5d',
+    'avg_precipitation_prev_5d',
+    'avg_humidity_prev_5d',
+    'avg_wind_speed_prev_5d',
+    'avg_visibility_prev_5d',
+]
+
+
+# To keep colors consistent, assign each downed reason a color
+def custom_palette(df, color='Pastel1'):
+    reasons_terms = df['reason'].unique().tolist()
+    palette = sns.color_palette(color, n_colors=len(reasons_terms))
+    return dict(zip(reasons_terms, palette))
+
+
+def avg_columns(df):
+    return [col for col in df.columns if col.startswith('avg')]
+
+
+# Up to this many events the SPLOM draws every event as a marker, past it the panels are 2-D histograms
+SPLOM_MAX_POINTS = 5000
+
+
+# mode: "points" (sns.pairplot), "hist" or "hex" (aggregated_splom), or "auto": points up to max_points events
+def weather_splom(df, columns=important_cols, mode="auto", max_points=SPLOM_MAX_POINTS, bins=64):
+    sub_df = df[columns + ['reason']].dropna()
+    if mode == "auto":
+        mode = "points" if len(sub_df) <= max_points else "hist"
+    if mode != "points":
+        fig = aggregated_splom(sub_df, columns, hue='reason', kind=mode, bins=bins, gridsize=bins // 2)
+        fig.suptitle("SPLOM of NOAA Rolling Averages by Downed Reason", y=1.02)
+        fig.tight_layout(rect=(0, 0, 0.88, 1))
+        return fig
+
+    grid = sns.pairplot(
+        sub_df,
+        vars=columns,
+        hue='reason',
+        corner=True,
+        plot_kws={'alpha': 0.6}
+    )
+
+    grid.figure.suptitle("SPLOM of NOAA Rolling Averages by Downed Reason", y=1.02)
+    grid.figure.tight_layout()
+    return grid.figure
+
+
+# The KDE curves of every avg_* column per reason, computed once for both KDE charts (see binned_kde.py)
+def reason_kde_curves(df, columns=None):
+    columns = avg_columns(df) if columns is None else columns
+    return kde_curves(df, columns, by='reason')
+
+
+# Draw the curves of one column like sns.kdeplot(fill=True) does: filled, with an opaque outline
+def draw_kde(ax, curves, our_colors, alpha, linewidth):
+    groups = {group: curve for group, curve in curves.groupby('group', sort=False)}
+    for reason in reversed(list(our_colors)):
+        if reason not in groups:
+            continue
+        curve = groups[reason]
+        color = our_colors[reason]
+        ax.fill_between(curve['x'], 0, curve['density'], facecolor=to_rgba(color, alpha),
+                        edgecolor=to_rgba(color, 1), linewidth=linewidth)
+    ax.set_ylim(bottom=0)
+    return [mpatches.Patch(facecolor=to_rgba(our_colors[r], alpha), edgecolor=to_rgba(our_colors[r], 1),
+                           linewidth=linewidth, label=r) for r in our_colors if r in groups]
+
+
+# KDE plot template for any weather feature
+def plot_kde_by_reason(df, x='avg_temperature_prev_5d'):
+    our_colors = custom_palette(df)
+    curves = reason_kde_curves(df, None if x in avg_columns(df) else [x])
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    handles = draw_kde(ax, curves[curves['column'] == x], our_colors, alpha=0.3, linewidth=2)
+    ax.legend(handles=handles, title='reason')
+    x = x.replace('_', ' ')
+    plt.title((f'Distribution of {x} by Downed Reason').title(), fontsize=10)
+    plt.xlabel(x)
+    plt.ylabel('Density')
+    plt.tight_layout()
+    return fig
+
+
+# A grid of KDEs for all the previous 5 day averages
+def plot_kde_grid(df):
+    our_colors = custom_palette(df)
+    curves = reason_kde_curves(df)
+    fig, axes = plt.subplots(3, 3, figsize=(15, 12))
+    axes = axes.flatten()
+
+    for i, col in enumerate(avg_columns(df)):
+        # No legend on every subplot, see fig.legend below
+        draw_kde(axes[i], curves[curves['column'] == col], our_colors, alpha=0.4, linewidth=2)
+
+        # Clean up the subplot titles by replacing underscores with spaces
+        axes[i].set_title(col.replace('_', ' ').title(), fontsize=12)
+        axes[i].set_xlabel('')
+        axes[i].set_ylabel('Density', fontsize=12)
+        axes[i].spines['top'].set_visible(False)
+        axes[i].spines['right'].set_visible(False)
+
+    fig.suptitle("Average Weather by Aircraft Downed Reason", fontsize=18, y=1.01)
+    fig.tight_layout()
+    fig.subplots_adjust(top=0.93)
+
+    # One legend for the whole grid
+    handles = [mpatches.Patch(color=our_colors[r], label=r) for r in our_colors.keys()]
+    fig.legend(
+        handles=handles,
+        loc='upper center',
+        bbox_to_anchor=(0.5, 0.98),
+        ncol=len(handles),
+        frameon=False,
+        fontsize=12
+    )
+    return fig
+
+
+def downed_counts_by_aircraft_and_reason(df):
+    # Count how many times each aircraft was downed for each reason
+    count_df = df.groupby(['resource', 'reason']).size().reset_index(name='count')
+
+    # Sort aircraft by total downed events for ordered plotting
+    aircraft_counts = df['resource'].value_counts()
+    count_df['resource'] = pd.Categorical(count_df['resource'], categories=aircraft_counts.index, ordered=True)
+
+    fig = plt.figure(figsize=(10, 8))
+    sns.barplot(
+        data=count_df,
+        y='resource',
+        x='count',
+        hue='reason',
+        palette=custom_palette(df),
+    )
+
+    plt.title("Downed Events per Aircraft by Reason", fontsize=12)
+    plt.xlabel("Event Count", fontsize=12)
+    plt.ylabel("Aircraft (Resource)", fontsize=12)
+    plt.legend(title='Reason', bbox_to_anchor=(1.01, 1), loc='upper left')
+    plt.tight_layout()
+    return fig
+
+
+# The same counts as a stacked bar chart, which is easier to read.
+# Seaborn doesn't have a stacked bar chart, so it is built with Matplotlib.
+def stacked_downed_counts_by_aircraft_and_reason(df):
+    our_colors = custom_palette(df)
+    # Create a pivot table of counts per resource and reason, aircraft ordered by total downed counts
+    count_df = df.groupby(['resource', 'reason']).size().unstack(fill_value=0)
+    count_df = count_df.loc[df['resource'].value_counts().index]
+
+    fig, ax = plt.subplots(figsize=(10, 8))
+    # To build each bar, start at 0 and loop through the reasons to keep the bars in the same order.
+    left = pd.Series([0] * len(count_df), index=count_df.index)
+
+    for reason in count_df.columns:
+        counts = count_df[reason]
+        ax.barh(count_df.index, counts, left=left, label=reason, color=our_colors.get(reason))
+        left += counts
+
+    for side in ('top', 'right', 'bottom', 'left'):
+        ax.spines[side].set_visible(False)
+
+    ax.set_xlabel("Total Downed Events", fontsize=12)
+    ax.set_ylabel("Aircraft Number", fontsize=12)
+    ax.margins(y=0.02)
+    ax.set_title("Downed Events per Aircraft by Reason", fontsize=12)
+    ax.legend(title='Reasons', bbox_to_anchor=(.8, 1), loc='upper left', fontsize=12)
+
+    plt.tight_layout()
+    return fig
+
+
+def downtime_barchart(df):
+    # Find the average duration time for each reason then convert the time back to hours for simplicity
+    avg_duration = df.groupby('reason')['duration'].mean().reset_index()
+    avg_duration['duration_hours'] = avg_duration['duration'].dt.total_seconds() / 3600
+
+    # Order the duration time from shortest to longest
+    plot_data = avg_duration.sort_values('duration_hours', ascending=True)
+
+    fig, ax = plt.subplots(figsize=(10, 8))
+    barplot = sns.barplot(
+        data=plot_data,
+        y='reason',
+        x='duration_hours',
+        hue='reason',
+        palette=custom_palette(df)
+    )
+
+    for i in barplot.containers:
+        # Add labels to each bar shown to 2 decimals
+        barplot.bar_label(i, fmt='%.2f', label_type='edge', padding=3)
+
+    # Remove the chart box
+    for side in ('top', 'right', 'bottom', 'left'):
+        ax.spines[side].set_visible(False)
+
+    plt.title('Average Downtime Duration by Reason', fontsize=12)
+    plt.xlabel('Average Duration (Hours)', fontsize=12)
+    plt.ylabel('Reason', fontsize=12)
+    plt.tight_layout()
+    return fig
+
+
+# Average downtime duration per reason over all downed events, inspections included
+def average_duration_by_reason(df):
+    avg_duration = df.groupby('reason')['duration'].mean().reset_index()
+    avg_duration['duration_hours'] = avg_duration['duration'].dt.total_seconds() / 3600
+    plot_data = avg_duration.sort_values('duration_hours', ascending=True)
+
+    fig = plt.figure(figsize=(12, 6))
+    barplot = sns.barplot(
+        data=plot_data,
+        y='reason',
+        x='duration_hours',
+        hue='reason',
+        palette='tab10'
+    )
+    for i in barplot.containers:
+        barplot.bar_label(i, fmt='%.1f', label_type='edge', padding=3)
+    plt.title('Average Downtime Duration by Reason', fontsize=14)
+    plt.xlabel('Average Duration')
+    plt.ylabel('Reason')
+    plt.tight_layout()
+    return fig
+
+
+# name: Chart(function, frame it draws, parameters, other modules it calls into).
+# The frames are the stages of WMU_NOAA_Analysis with the same name.
+CATALOG = {
+    "weather_splom": Chart(weather_splom, "final_merged", {"columns": important_cols}, modules=["aggregated_splom"]),
+    "kde_avg_temperature_prev_5d": Chart(plot_kde_by_reason, "final_merged", {"x": "avg_temperature_prev_5d"},
+                                         modules=["binned_kde"]),
+    "kde_grid": Chart(plot_kde_grid, "final_merged", modules=["binned_kde"]),
+    "downed_counts_by_aircraft_and_reason": Chart(downed_counts_by_aircraft_and_reason, "final_merged"),
+    "stacked_downed_counts_by_aircraft_and_reason": Chart(stacked_downed_counts_by_aircraft_and_reason,
+                                                          "final_merged"),
+    "downtime_barchart": Chart(downtime_barchart, "final_merged"),
+    "average_duration_by_reason": Chart(average_duration_by_reason, "downed"),
+}
+
+
+def draw_charts(final_merged_df, downed_df, names=None, directory=CHART_DIR, force=False, max_workers=None):
+    report = render_charts(CATALOG, {"final_merged": final_merged_df, "downed": downed_df}, directory,
+                           names, force, max_workers)
+    print(report.to_string(index=False, float_format="%.2f"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the chart catalog to image files.")
+    parser.add_argument("names", nargs="*", help="charts to render (default: all)")
+    parser.add_argument("--out", default=CHART_DIR, help=f"directory to write to (default: {CHART_DIR})")
+    parser.add_argument("--force", action="store_true", help="render even the charts that haven't changed")
+    parser.add_argument("--workers", type=int, default=None, help="processes to render with")
+    parser.add_argument("--list", action="store_true", help="list the charts and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, chart in CATALOG.items():
+            print(f"{name:48} {chart.data}")
+        return
+
+    # The frames come from the analysis pipeline, rebuilt only if their inputs changed
+    from pipeline import Pipeline
+    from WMU_NOAA_Analysis import STAGES
+    results, _ = Pipeline(STAGES).run(["final_merged", "downed"])
+    draw_charts(results["final_merged"], results["downed"], args.names or None, args.out, args.force, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+# Regex matching over a whole text column at once, shared by the METAR decoder and the duration parser.
+# pyarrow is optional. Its regex kernels run over the whole column in C++, which is roughly ten times faster
+# than pandas' str.extract. Without it the same patterns go through str.extract.
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+
+# Pull the named groups of pattern out of every value, as a dict of string columns.
+# Groups that didn't match come back as NaN (pandas) or "" (pyarrow).
+def extract(text, pattern):
+    if pa is None:
+        return dict(text.str.extract(pattern).items())
+
+    fields = pc.extract_regex(text, pattern)
+    return {fields.type.field(i).name: pc.struct_field(fields, [i]) for i in range(fields.type.num_fields)}
+
+
+# True where an optional group of an extracted column matched.
+def matched(strings):
+    if pa is None:
+        return strings.notna().to_numpy()
+
+    return pc.fill_null(pc.not_equal(strings, ""), False).to_numpy(zero_copy_only=False)
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import pickle
+import sys
+
+import pandas as pd
+
+# Parquet needs pyarrow. Without it the cache falls back to pickle files.
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = "parquet"
+except ImportError:
+    CACHE_FORMAT = "pkl"
+
+CACHE_DIR = ".noaa_cache"
+MAX_CACHE_BYTES = 512 * 1024 ** 2
+
+
+def write_frame(df, path):
+    # Write to a temporary name first, so a crash never leaves half a file behind under the real name
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if CACHE_FORMAT == "parquet":
+        df.to_parquet(tmp)
+    else:
+        with open(tmp, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def read_frame(path):
+    if CACHE_FORMAT == "parquet":
+        return pd.read_parquet(path)
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+# Hash a file's contents, so a copy of the same csv hits the same entries and an edited one doesn't.
+def file_fingerprint(path, chunk_size=1024 ** 2):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Hash the source of the modules that build a cached frame. Editing any of them invalidates its entries.
+def code_fingerprint(*module_names):
+    digest = hashlib.blake2b(digest_size=16)
+    for name in module_names:
+        digest.update(file_fingerprint(sys.modules[name].__file__).encode())
+    return digest.hexdigest()
+
+
+# A content-addressed store of DataFrames on disk.
+# Entries are named by a hash of everything that went into them (input file, parameters, code version),
+# so a changed input simply misses. The least recently used entries are removed once the directory
+# grows past max_bytes.
+class DiskCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.{CACHE_FORMAT}")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        # Touch the entry so eviction sees it as recently used
+        os.utime(path)
+        return read_frame(path)
+
+    def has(self, key):
+        return os.path.exists(self._path(key))
+
+    def put(self, key, df):
+        os.makedirs(self.directory, exist_ok=True)
+        write_frame(df, self._path(key))
+        self.evict()
+
+    def entries(self):
+        if not os.path.isdir(self.directory):
+            return []
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                 if name.endswith(f".{CACHE_FORMAT}")]
+        return sorted(paths, key=os.path.getmtime)
+
+    # Remove the least recently used entries until the cache fits in max_bytes.
+    def evict(self):
+        entries = self.entries()
+        total = sum(os.path.getsize(path) for path in entries)
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+    # Remove one entry, or every entry if no key is given.
+    def invalidate(self, key=None):
+        paths = self.entries() if key is None else [self._path(key)]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,80 @@
+import pandas as pd
+
+from durations import parse_durations
+from maintenance_data import HISTORY_CSV, REASON_CSV, maintenance
+from reason_data import combine_reason
+from reason_taxonomy import reason_classifier, subcategory_classifier
+
+# One table of downtime events built from both maintenance exports.
+#   Resource Down History.csv     per event: duration as H:MM:SS, downed reason, squawk and comments
+#   Resources Downed by Reason.csv per event: duration as decimal hours, downed reason / eta squawk
+# Both exports list the same events, but in a different order, and the upped times can differ by a minute
+# (rounding). So the join key is the resource and the downed timestamp. A resource downed twice at the same
+# minute appears in both files; those events are numbered in upped order and joined by that number too.
+# reason and subcategory come from the taxonomies in reason_taxonomy.py.
+
+# Aircraft no longer in the fleet. Their rows are dropped by name, not by position.
+SOLD_AIRCRAFT = ("W30 1180",)
+
+TIMESTAMP_FORMAT = "%m/%d/%Y %H:%M"
+
+EVENT_COLUMNS = ["resource", "reg", "downed", "upped", "duration", "reported duration",
+                 "downed reason", "reason", "subcategory", "squawk", "comments"]
+
+
+# The default exports come from the shared maintenance reader, other paths are read directly
+def read_history_export(path=HISTORY_CSV):
+    df = maintenance.history_export() if path == maintenance.history_path else pd.read_csv(path)
+    df = df[["registration number", "downed", "upped", "duration", "downed reason", "squawk", "comments"]]
+    return df.rename(columns={"registration number": "resource"})
+
+
+def read_reason_export(path=REASON_CSV):
+    df = maintenance.reason_export() if path == maintenance.reason_path else pd.read_csv(path)
+    return df[["resource", "downed", "upped", "duration", "downed reason", "eta squawk"]]
+
+
+# Parse the timestamps and number the events that share a resource and downed time
+def _keyed(df):
+    df = df[~df["resource"].isin(SOLD_AIRCRAFT)].copy()
+    df["downed"] = pd.to_datetime(df["downed"], format=TIMESTAMP_FORMAT)
+    df["upped"] = pd.to_datetime(df["upped"], format=TIMESTAMP_FORMAT)
+    df = df.sort_values(["resource", "downed", "upped"], kind="stable")
+    df["occurrence"] = df.groupby(["resource", "downed"]).cumcount()
+    return df
+
+
+def build_events(history_path=HISTORY_CSV, reason_path=REASON_CSV):
+    history = _keyed(read_history_export(history_path))
+    reasons = _keyed(read_reason_export(reason_path))
+    df = history.merge(reasons, on=["resource", "downed", "occurrence"], how="outer",
+                       suffixes=("", "_reason"), validate="one_to_one")
+
+    reported, failures = parse_durations(df["duration"])
+    reported_hours, failures_hours = parse_durations(df["duration_reason"], unit="hours")
+    events = pd.DataFrame({
+        "resource": df["resource"].astype("category"),
+        "reg": df["resource"].str.split().str[-1].astype("category"),  # "WMU31 N1281" -> "N1281"
+        "downed": df["downed"],
+        "upped": df["upped"].fillna(df["upped_reason"]),
+        # The history export has minutes, the reason export only tenths of an hour
+        "reported duration": reported.fillna(reported_hours),
+        "downed reason": df["downed reason"].fillna(df["downed reason_reason"]).astype("category"),
+        "reason": reason_classifier.classify(combine_reason(df["downed reason_reason"], df["eta squawk"])),
+        "squawk": df["squawk"].fillna(df["eta squawk"]).astype("string"),
+        "comments": df["comments"].astype("string"),
+    })
+    # The comments are the more specific of the two, e.g. "boost pump" for an "Engine" squawk
+    events["subcategory"] = subcategory_classifier.classify(
+        events["comments"].fillna("") + " " + events["squawk"].fillna(""))
+    # Rows without an upped time are still down, or were never closed out: use the reported duration
+    events["duration"] = (events["upped"] - events["downed"]).fillna(events["reported duration"])
+
+    events = events.sort_values(["downed", "resource"], kind="stable").reset_index(drop=True)[EVENT_COLUMNS]
+    events.attrs["duration failures"] = failures["value"].tolist() + failures_hours["value"].tolist()
+    return events
+
+
+# The event table of the default exports, built once
+def events():
+    return maintenance.stage("events", build_events)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from column_regex import extract, matched, pa, pc
+
+# Downtime durations come in several text formats depending on which export they are from:
+#   "58293:10:00"  hours:minutes:seconds (Resource Down History)
+#   "0:19"         hours:minutes, used when there are no seconds
+#   ":45"          seconds
+#   "58,293.10"    decimal hours, with comma grouping (Resources Downed by Reason)
+# parse_durations matches a whole column against one pattern at once (in pyarrow when it is installed, see
+# column_regex.py) and converts it with array arithmetic.
+# Values that don't fit any format are returned in a failures frame instead of being printed.
+
+DURATION_PATTERN = (r"^(?:(?P<h>\d+):(?P<m>\d{2})(?::(?P<s>\d{2}(?:\.\d+)?))?"
+                    r"|:(?P<ss>\d+(?:\.\d+)?)"
+                    r"|(?P<number>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?))$")
+
+
+# Extracted string column to float64; groups that didn't take part are NaN
+def _number(strings):
+    if pa is None:
+        return pd.to_numeric(strings.str.replace(",", "", regex=False), errors="coerce").to_numpy(dtype="float64")
+
+    strings = pc.replace_substring(strings, ",", "")
+    strings = pc.if_else(pc.equal(strings, ""), pa.scalar(None, pa.string()), strings)
+    return pc.cast(strings, pa.float64()).to_numpy(zero_copy_only=False)
+
+
+# unit says what a bare number means: "hours" or "seconds". With "auto" it is hours, unless the column also
+# has clock-style values, in which case bare numbers are seconds (the old parse_mixed_time rule).
+# Returns the durations as timedelta64 and a frame of the values that couldn't be parsed.
+def parse_durations(values, unit="auto"):
+    values = pd.Series(values)
+    if pa is None:
+        text = values.astype("string").str.strip()
+    else:
+        text = pc.utf8_trim_whitespace(pa.array(values.astype("string"), type=pa.string(), from_pandas=True))
+    parts = extract(text, DURATION_PATTERN)
+
+    clock, seconds_only, number = (matched(parts[group]) for group in ("h", "ss", "number"))
+
+    if unit == "auto":
+        unit = "seconds" if (clock.any() or seconds_only.any()) else "hours"
+    if unit not in ("hours", "seconds"):
+        raise ValueError(f"unit must be 'auto', 'hours' or 'seconds', not {unit!r}")
+
+    seconds = np.nan_to_num(_number(parts["h"]) * 3600) + np.nan_to_num(_number(parts["m"]) * 60)
+    for group, scale in (("s", 1), ("ss", 1), ("number", 3600 if unit == "hours" else 1)):
+        seconds += np.nan_to_num(_number(parts[group]) * scale)
+    parsed = clock | seconds_only | number
+    seconds[~parsed] = np.nan
+
+    durations = pd.Series(pd.to_timedelta(np.round(seconds, 6), unit="s").astype("timedelta64[ns]"),
+                          index=values.index, name=values.name)
+
+    missing = values.isna().to_numpy()
+    failed = ~parsed & ~missing
+    failures = pd.DataFrame({"value": values[failed]})
+    return durations, failures
@@ -0,0 +1,136 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from disk_cache import CACHE_FORMAT, file_fingerprint, read_frame, write_frame
+from downtime_events import HISTORY_CSV, REASON_CSV, build_events
+
+# An inverted index over the text of the downtime events (downed reason, squawk, comments).
+# Every token maps to a sorted list of postings, one per occurrence, each encoded as row * ROW_STRIDE + position.
+# The positions of the next field start FIELD_GAP further on, so a phrase never runs from one field into another.
+#   - a term query reads one posting list
+#   - a phrase query intersects the lists of its words, each shifted back by its place in the phrase
+#   - a prefix query reads the run of terms in the sorted vocabulary that start with the prefix
+# Events are kept sorted by downed time, so a date range is a range of rows, found by binary search.
+#
+# Query syntax for search(): words must all appear, "quoted words" must appear in that order, and pump* matches
+# any word starting with pump. For example  index.search('"boost pump"', tail="WMU31", start="2024-07-01")
+
+TEXT_FIELDS = ["downed reason", "squawk", "comments"]
+TOKEN_PATTERN = r"[a-z0-9#]+"
+QUERY_PATTERN = r'"([^"]*)"|(\S+)'
+
+FIELD_GAP = 1 << 16
+ROW_STRIDE = 1 << 20
+EVENTS_DIR = "events"
+
+
+def tokens(text):
+    return re.findall(TOKEN_PATTERN, text.lower())
+
+
+class EventIndex:
+    def __init__(self, events, vocabulary, offsets, postings):
+        self.events = events
+        self.vocabulary = vocabulary  # sorted array of terms
+        self.offsets = offsets        # postings of term i are postings[offsets[i]:offsets[i + 1]]
+        self.postings = postings
+        self.downed = events["downed"].to_numpy(dtype="datetime64[ns]")
+        # A tail is given as the whole resource ("WMU31 N1281"), the unit ("WMU31") or the registration ("N1281")
+        resource = events["resource"].astype(str)
+        self.tails = np.stack([resource.to_numpy(dtype=str), resource.str.split().str[0].to_numpy(dtype=str),
+                               events["reg"].astype(str).to_numpy(dtype=str)], axis=1)
+
+    @classmethod
+    def build(cls, events):
+        events = events.sort_values("downed", kind="stable").reset_index(drop=True)
+        pieces = []
+        for field_number, field in enumerate(TEXT_FIELDS):
+            words = events[field].astype("string").fillna("").str.lower().str.findall(TOKEN_PATTERN).explode()
+            words = words[words.notna()]
+            rows = words.index.to_numpy(dtype=np.int64)
+            positions = words.groupby(level=0).cumcount().to_numpy() + field_number * FIELD_GAP
+            pieces.append(pd.DataFrame({"term": words.to_numpy(dtype=str), "key": rows * ROW_STRIDE + positions}))
+        occurrences = pd.concat(pieces, ignore_index=True)
+
+        codes, vocabulary = pd.factorize(occurrences["term"], sort=True)
+        keys = occurrences["key"].to_numpy()
+        order = np.lexsort((keys, codes))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(vocabulary)))])
+        return cls(events, np.asarray(vocabulary, dtype=str), offsets, keys[order])
+
+    # Postings of vocabulary entry i that fall in rows [first, last)
+    def _postings(self, i, first, last):
+        postings = self.postings[self.offsets[i]:self.offsets[i + 1]]
+        return postings[np.searchsorted(postings, first * ROW_STRIDE):np.searchsorted(postings, last * ROW_STRIDE)]
+
+    def _term(self, term, first, last):
+        i = np.searchsorted(self.vocabulary, term)
+        if i < len(self.vocabulary) and self.vocabulary[i] == term:
+            return self._postings(i, first, last)
+        return self.postings[:0]
+
+    def _prefix(self, prefix, first, last):
+        terms = range(np.searchsorted(self.vocabulary, prefix), np.searchsorted(self.vocabulary, prefix + "\uffff"))
+        return np.sort(np.concatenate([self.postings[:0]] + [self._postings(i, first, last) for i in terms]))
+
+    def _phrase(self, words, first, last):
+        starts = self._term(words[0], first, last)
+        for shift, word in enumerate(words[1:], start=1):
+            starts = np.intersect1d(starts, self._term(word, first, last) - shift, assume_unique=True)
+        return starts
+
+    # Row numbers of the events matching the query, the tail and the date range [start, end).
+    # The date range is applied first, by cutting every posting list down to the rows inside it.
+    def match(self, query="", tail=None, start=None, end=None):
+        first = 0 if start is None else np.searchsorted(self.downed, pd.Timestamp(start).to_datetime64())
+        last = len(self.downed) if end is None else np.searchsorted(self.downed, pd.Timestamp(end).to_datetime64())
+        rows = None
+        for phrase, word in re.findall(QUERY_PATTERN, query):
+            words = tokens(phrase or word)
+            if not words:
+                continue
+            if word.endswith("*"):
+                keys = self._prefix(word[:-1].lower(), first, last)
+            else:
+                keys = self._phrase(words, first, last)
+            found = np.unique(keys // ROW_STRIDE)
+            rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+
+        if rows is None:
+            rows = np.arange(first, last)
+        if tail is not None:
+            rows = rows[(self.tails[rows] == tail).any(axis=1)]
+        return rows
+
+    def search(self, query="", tail=None, start=None, end=None):
+        return self.events.iloc[self.match(query, tail, start, end)]
+
+    def save(self, directory=EVENTS_DIR, sources=()):
+        os.makedirs(directory, exist_ok=True)
+        write_frame(self.events, os.path.join(directory, f"events.{CACHE_FORMAT}"))
+        np.savez(os.path.join(directory, "index.npz"), vocabulary=self.vocabulary, offsets=self.offsets,
+                 postings=self.postings, sources=np.asarray(sources, dtype=str))
+
+    @classmethod
+    def load(cls, directory=EVENTS_DIR):
+        arrays = np.load(os.path.join(directory, "index.npz"))
+        events = read_frame(os.path.join(directory, f"events.{CACHE_FORMAT}"))
+        index = cls(events, arrays["vocabulary"], arrays["offsets"], arrays["postings"])
+        index.sources = arrays["sources"].tolist()
+        return index
+
+
+# The saved index, or a new one (saved for next time) if there is none or the exports have changed
+def load_event_index(directory=EVENTS_DIR, history_path=HISTORY_CSV, reason_path=REASON_CSV):
+    sources = [file_fingerprint(history_path), file_fingerprint(reason_path)]
+    if os.path.exists(os.path.join(directory, "index.npz")):
+        index = EventIndex.load(directory)
+        if index.sources == sources:
+            return index
+
+    index = EventIndex.build(build_events(history_path, reason_path))
+    index.save(directory, sources)
+    return index
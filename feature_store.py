@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import NOAA
+
+# The cleaned NOAA features on disk as one .npy file per column, opened memory-mapped.
+# The store directory holds versions, and a CURRENT file naming the one to read. A version is a directory of:
+#   DATE.npy       the sorted observation times, datetime64[ns]
+#   <column>.npy   one float64 array per feature column
+#   meta.json      the column order, the row count and the fingerprint of what the store was built from
+# Opening a store reads only CURRENT and meta.json. The arrays are mapped, not loaded, so any number of processes and
+# notebook kernels share the same page-cached copy, and a lookup touches only the pages of the rows it returns.
+# A new version is written next to the current one and CURRENT is replaced in one rename, so there is always a
+# complete store to open, even if the writer crashes. The version it replaced is kept until the next write, so
+# processes that opened it just before the swap can still read it; they see the new one when they reopen.
+
+FEATURE_STORE_DIR = "feature_store"
+CURRENT = "CURRENT"
+
+
+def _column_file(directory, col):
+    return os.path.join(directory, f"{col}.npy")
+
+
+# Name of the version CURRENT points at, None if there is no store yet
+def current_version(directory):
+    try:
+        with open(os.path.join(directory, CURRENT)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_feature_store(df, directory=FEATURE_STORE_DIR, fingerprint=None, date_col="DATE"):
+    df = df.sort_values(date_col, kind="stable")
+    columns = [col for col in df.columns if col != date_col]
+
+    version = f"v{time.time_ns()}.{os.getpid()}"
+    tmp = os.path.join(directory, f"{version}.tmp")
+    os.makedirs(tmp)
+    np.save(_column_file(tmp, "DATE"), df[date_col].to_numpy(dtype="datetime64[ns]"))
+    for col in columns:
+        np.save(_column_file(tmp, col), df[col].to_numpy(dtype="float64"))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"columns": columns, "rows": len(df), "fingerprint": fingerprint}, f)
+    os.replace(tmp, os.path.join(directory, version))
+
+    # Point CURRENT at the new version in one rename
+    previous = current_version(directory)
+    pointer = os.path.join(directory, CURRENT)
+    with open(f"{pointer}.{os.getpid()}.tmp", "w") as f:
+        f.write(version)
+    os.replace(f"{pointer}.{os.getpid()}.tmp", pointer)
+
+    # Remove the versions before the one just replaced. Writes still in progress (.tmp) are left alone.
+    for name in os.listdir(directory):
+        if name in (CURRENT, version, previous) or name.endswith(".tmp"):
+            continue
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
+    return FeatureStore(directory)
+
+
+class FeatureStore:
+    def __init__(self, directory=FEATURE_STORE_DIR):
+        self.directory = directory
+        version = current_version(directory)
+        if version is None:
+            raise FileNotFoundError(f"No feature store in {directory!r}")
+        # The version is fixed when the store is opened; a later write doesn't move an open store
+        self.path = os.path.join(directory, version)
+        with open(os.path.join(self.path, "meta.json")) as f:
+            meta = json.load(f)
+        self.columns = meta["columns"]
+        self.fingerprint = meta["fingerprint"]
+        self.times = np.load(_column_file(self.path, "DATE"), mmap_mode="r")
+        self._arrays = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    # The memory-mapped array of one column (read-only)
+    def column(self, col):
+        if col not in self._arrays:
+            if col not in self.columns:
+                raise KeyError(col)
+            self._arrays[col] = np.load(_column_file(self.path, col), mmap_mode="r")
+        return self._arrays[col]
+
+    # Row of the latest observation at or before each timestamp, -1 where there is none (or it is older
+    # than tolerance)
+    def rows_at(self, when, tolerance=None):
+        when = pd.Series(np.atleast_1d(when))
+        if not pd.api.types.is_datetime64_any_dtype(when):
+            when = pd.to_datetime(when, format="mixed")
+        when = when.to_numpy(dtype="datetime64[ns]")
+        rows = np.searchsorted(self.times, when, side="right") - 1
+        if tolerance is not None:
+            stale = when - self.times[np.maximum(rows, 0)] > pd.Timedelta(tolerance).to_timedelta64()
+            rows[stale] = -1
+        return rows
+
+    # Point-in-time lookup: a frame with one row per timestamp, NaN where there is no observation
+    def lookup(self, when, columns=None, tolerance=None):
+        rows = self.rows_at(when, tolerance)
+        found = rows >= 0
+        out = {"DATE": np.where(found, self.times[np.maximum(rows, 0)], np.datetime64("NaT"))}
+        for col in self.columns if columns is None else columns:
+            out[col] = np.where(found, self.column(col)[np.maximum(rows, 0)], np.nan)
+        return pd.DataFrame(out)
+
+    def to_frame(self, columns=None):
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({"DATE": np.asarray(self.times), **{col: np.asarray(self.column(col)) for col in columns}})
+
+
+# Open the store of the NOAA features, building it first if it is missing or out of date with the csv and code.
+def open_feature_store(directory=FEATURE_STORE_DIR, loader=None):
+    loader = NOAA.loader if loader is None else loader
+    fingerprint = list(loader.fingerprint())
+    if current_version(directory) is not None:
+        store = FeatureStore(directory)
+        if store.fingerprint == fingerprint:
+            return store
+
+    # Raw columns plus avg_*_prev_*d for every window
+    return write_feature_store(loader.get_NOAA_features(stats=("mean",)), directory, fingerprint)
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+# How many aircraft were down at any moment, from the downed/upped intervals of the events.
+# Works with events(), downed() or history(): anything with resource (or reg), downed, upped and duration columns.
+#
+# The intervals are swept once in time order: +1 where a tail goes down, -1 where it comes back up. Per tail,
+# the running count says whether it is down, which merges overlapping intervals, so two open events on one tail
+# still count as one aircraft down. From the merged intervals, down time up to any instant is a prefix sum,
+# and the down time inside every bin of the series is the difference between two of those, found with
+# searchsorted. Nothing is expanded per interval or per hour: O(n log n) in the events plus O(bins) per tail.
+#
+# Rows without an upped time (the ones complete_duration patches) end at downed + duration, that is the
+# reported duration, which runs to when the export was taken. If that is missing too, the tail is down until
+# the end of the series.
+
+OPEN_END = np.datetime64(pd.Timestamp.max, "ns")
+
+
+def _tails(events):
+    return events["resource"] if "resource" in events else events["reg"]
+
+
+# Merged down intervals per tail: resource, start, end, with no two intervals of one tail overlapping
+def down_intervals(events):
+    downed = events["downed"].to_numpy(dtype="datetime64[ns]")
+    upped = events["upped"].to_numpy(dtype="datetime64[ns]")
+    if "duration" in events:
+        upped = np.where(np.isnat(upped), downed + events["duration"].to_numpy(dtype="timedelta64[ns]"), upped)
+    upped = np.where(np.isnat(upped), OPEN_END, upped)
+
+    tails, names = pd.factorize(_tails(events).astype(str), sort=True)
+    n = len(downed)
+    tail = np.concatenate([tails, tails])
+    when = np.concatenate([downed, upped])
+    step = np.concatenate([np.ones(n, dtype=np.int64), -np.ones(n, dtype=np.int64)])
+
+    # Sort by tail, then time, with ups before downs at the same instant so back-to-back intervals stay apart.
+    # Every tail's steps add up to zero, so one running sum over all of them restarts at 0 for each tail.
+    order = np.lexsort((step, when, tail))
+    tail, when, step = tail[order], when[order], step[order]
+    count = np.cumsum(step)
+
+    starts = (step == 1) & (count == 1)
+    ends = (step == -1) & (count == 0)
+    return pd.DataFrame({"resource": pd.Categorical.from_codes(tail[starts], names),
+                         "start": when[starts], "end": when[ends]})
+
+
+# Down time of each bin [edges[i], edges[i + 1]) given sorted, non-overlapping intervals
+def _down_per_bin(starts, ends, edges):
+    lengths = (ends - starts).astype(np.int64)
+    before = np.r_[0, np.cumsum(lengths)]
+
+    # Down time from the beginning of time up to each edge
+    k = np.searchsorted(starts, edges, side="right")
+    last = np.maximum(k - 1, 0)
+    inside = np.clip((edges - starts[last]).astype(np.int64), 0, lengths[last])
+    upto = before[last] + np.where(k > 0, inside, 0)
+    return np.diff(upto)
+
+
+def _edges(intervals, freq, start, end):
+    step = pd.Timedelta(freq)
+    first = pd.Timestamp(start) if start is not None else pd.Timestamp(intervals["start"].min()).floor(step)
+    if end is None:
+        finite = intervals["end"][intervals["end"] < OPEN_END]
+        end = max(finite.max(), intervals["start"].max())
+    last = pd.Timestamp(end).ceil(step)
+    return pd.date_range(first, max(last, first + step), freq=step)
+
+
+# Fraction of every bin each aircraft was down: one column per tail, indexed by the bin start
+def aircraft_down_fraction(events, freq="1D", start=None, end=None):
+    intervals = down_intervals(events)
+    edges = _edges(intervals, freq, start, end)
+    edge_values = edges.to_numpy(dtype="datetime64[ns]")
+    width = np.diff(edge_values).astype(np.int64)
+
+    columns = {}
+    for resource, tail in intervals.groupby("resource", observed=True, sort=True):
+        starts = tail["start"].to_numpy(dtype="datetime64[ns]")
+        ends = tail["end"].to_numpy(dtype="datetime64[ns]")
+        columns[resource] = _down_per_bin(starts, ends, edge_values) / width
+    return pd.DataFrame(columns, index=pd.Index(edges[:-1], name="time"))
+
+
+# Fleet-wide series: the average number of aircraft down in each bin and the fraction of the fleet available.
+# fleet_size defaults to the number of tails in the events.
+def fleet_availability(events, freq="1D", start=None, end=None, fleet_size=None):
+    down = aircraft_down_fraction(events, freq, start, end)
+    fleet_size = down.shape[1] if fleet_size is None else fleet_size
+    fleet = pd.DataFrame({"aircraft down": down.sum(axis=1)}, index=down.index)
+    fleet["aircraft available"] = fleet_size - fleet["aircraft down"]
+    fleet["availability"] = fleet["aircraft available"] / fleet_size
+    return fleet
@@ -1,36 +1,23 @@
 import pandas as pd
-import re
-import numpy as np
 
-#################### This code is not used in the final analysis ###################
+from durations import parse_durations
+from instrumentation import stage, traced
+from maintenance_data import maintenance
 
+#################### This code is not used in the final analysis ###################
 
-history_df = pd.read_csv("Resource Down History.csv")
 
-# Needed to clean "duration" separately
+# Needed to clean "duration" separately. One value at a time; history() parses the whole column with parse_durations.
+# "H:MM" is hours and minutes, the same as the "H:MM:SS" values.
 def parse_mixed_time(val):
-    try:
-        val = val.strip()
-
-        # HH:MM:SS
-        if re.match(r"^\d+:\d{2}:\d{2}(\.\d+)?$", val):
-            return pd.to_timedelta(val)
-
-        # MM:SS or M:SS
-        if re.match(r"^\d+:\d{2}$", val):
-            mins, secs = map(int, val.split(":"))
-            return pd.to_timedelta(pd.Timedelta(minutes=mins, seconds=secs))
-
-        # :SS
-        if re.match(r"^\d+$", val):
-            return pd.to_timedelta(seconds=int(val))
-
-    # It can be nan if the number is too wild
-    except Exception as e:
-        print(f"Error parsing '{val}': {e}")
-        return np.nan
+    return parse_durations(pd.Series([val]))[0].iloc[0]
 
+# Read once and kept, see maintenance_data.py
 def history():
+    return maintenance.stage("history", build_history)
+
+@traced("history")
+def build_history():
     # -------------------------------------------------------------- #
     # 1. The first and second columns are repeating strings, headers for Excel.
     # 2. Four features have repeating values that may not be accurate.
@@ -46,38 +33,34 @@ def history():
                            "total tail down time", "avg tail down time",
                            "upped", "downed", "duration",
                            "downed reason", "squawk", "comments"]
-    df = pd.read_csv("Resource Down History.csv", usecols=interesting_columns)
+    with stage("history.read_export") as s:
+        df = maintenance.history_export()
+        s.rows = len(df)
+    df = df[[col for col in df.columns if col in interesting_columns]]
     df = df.drop(index=0) # Sold aircraft
     df.rename(columns={"registration number": "reg"}, inplace=True)
 
     # Correcting Datatypes
-    df["total tail down time"] = pd.to_timedelta(df["total tail down time"])
-    df["avg tail down time"] = pd.to_timedelta(df["avg tail down time"])
-    df["upped"] = pd.to_datetime(df["upped"])
-    df["downed"] = pd.to_datetime(df["downed"])
-    df["reported duration"] = df["duration"].apply(parse_mixed_time)
+    with stage("history.parse_dates") as s:
+        df["total tail down time"] = pd.to_timedelta(df["total tail down time"])
+        df["avg tail down time"] = pd.to_timedelta(df["avg tail down time"])
+        df["upped"] = pd.to_datetime(df["upped"])
+        df["downed"] = pd.to_datetime(df["downed"])
+        s.rows = len(df)
+    with stage("history.parse_durations") as s:
+        df["reported duration"], failures = parse_durations(df["duration"])
+        s.rows = len(df)
+    df.attrs["duration failures"] = failures["value"].tolist()  # Values that didn't fit any duration format
     df["duration"] = df["upped"] - df["downed"]
 
-    def complete_duration ():
-        nans = df[df["duration"].isna()].index  # index of all NaN values [57, 132, 266, 441, 727, 861, 900]
-        for i in nans:
-            df.at[i, "duration"] = df.at[i, "reported duration"]  # Filling NaN from "reported duration"
-        return df["duration"]
-
-    df["duration"] = complete_duration()
+    df["duration"] = df["duration"].fillna(df["reported duration"])  # Filling NaN from "reported duration"
 
     return df
 
 # Average down-time for the fleet of SR20s
 def fleet_average_down_time():
-    fleet_avg_down_time = history_df["avg down time per resource"].iloc[0]
-    fleet_avg_down_time = pd.to_timedelta(fleet_avg_down_time)
-
-    return fleet_avg_down_time
+    return maintenance.fleet_average_down_time()
 
 # Total down-time for the fleet of SR20s
 def total_down_time():
-    total_down_time = history_df["total down time"].iloc[1]
-    total_down_time = pd.to_timedelta(total_down_time)
-
-    return total_down_time
+    return maintenance.total_down_time()
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+# The NOAA frame on a fixed time grid.
+# LCD mixes routine METARs (FM-15, usually at :53) with specials (FM-16, SPECI) at any minute, so the DATE
+# index is ragged and some hours have several reports. HourlyGrid puts one row in every cell of a fixed step
+# (an hour by default) and keeps the values in one contiguous 2-D array, so finding the row for a timestamp
+# is arithmetic instead of a search.
+#
+# Collapsing rule: each cell is labelled by its end, and a report belongs to the cell labelled t when it falls
+# in (t - step, t]. If the cell has a routine FM-15 report, the latest one is used; otherwise the latest special.
+# A cell without any report repeats the previous cell and is marked in gap_filled.
+# A lookup goes to the last cell labelled at or before the timestamp asked for, so it never sees a report
+# from later than that timestamp. observed keeps the DATE of the report behind every cell, and
+# build_hourly_grid checks it against the labels.
+
+ROUTINE_REPORT = "FM-15"
+
+
+class HourlyGrid:
+    def __init__(self, start, step, columns, values, gap_filled, report_type, observed):
+        self.start = pd.Timestamp(start)
+        self.step = pd.Timedelta(step)
+        self.columns = list(columns)
+        self.values = np.ascontiguousarray(values, dtype="float64")
+        self.gap_filled = np.asarray(gap_filled, dtype=bool)
+        self.report_type = np.asarray(report_type, dtype=object)
+        self.observed = np.asarray(observed, dtype="datetime64[ns]")
+        self._col = {col: i for i, col in enumerate(self.columns)}
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def times(self):
+        return self.start + self.step * np.arange(len(self))
+
+    # Cell number for one timestamp or an array of them. Raises outside the grid.
+    def index_of(self, when):
+        when = pd.to_datetime(when)
+        cells = np.asarray((when - self.start) // self.step, dtype=np.int64)
+        if np.any(cells < 0) or np.any(cells >= len(self)):
+            raise KeyError(f"{when} is outside the grid {self.start} to {self.start + self.step * len(self)}")
+        return cells
+
+    # Values at the given time(s): a 1-D row for one timestamp, a 2-D array for several
+    def lookup(self, when, columns=None):
+        cells = self.index_of(when)
+        if columns is None:
+            return self.values[cells]
+        return self.values[cells][..., [self._col[col] for col in columns]]
+
+    def column(self, col):
+        return self.values[:, self._col[col]]
+
+    def to_frame(self):
+        df = pd.DataFrame(self.values, columns=self.columns, index=pd.Index(self.times, name="DATE"))
+        df["gap_filled"] = self.gap_filled
+        df["report_type"] = self.report_type
+        df["observed"] = self.observed
+        return df
+
+    @classmethod
+    def from_frame(cls, df):
+        step = df.index[1] - df.index[0] if len(df) > 1 else pd.Timedelta(hours=1)
+        columns = [col for col in df.columns if col not in ("gap_filled", "report_type", "observed")]
+        return cls(df.index[0], step, columns, df[columns].to_numpy(), df["gap_filled"].to_numpy(),
+                   df["report_type"].to_numpy(), df["observed"].to_numpy())
+
+
+# Project a frame with DATE and numeric columns onto the grid. report_type is the REPORT_TYPE of each row.
+def build_hourly_grid(df, report_type, freq="1h"):
+    step = pd.Timedelta(freq)
+    columns = [col for col in df.columns if col != "DATE"]
+    times = pd.to_datetime(df["DATE"]).to_numpy(dtype="datetime64[ns]")
+    # The first cell is the first label at or after the earliest report, and every report goes to the
+    # first label at or after it: ceil((time - start) / step).
+    start = pd.Timestamp(times.min()).ceil(step)
+    cells = (-((start.to_datetime64() - times) // step.to_timedelta64())).astype(np.int64)
+    n_cells = int(cells.max()) + 1
+
+    # Order the rows by cell, then specials before routine reports, then time; the last row of each cell wins
+    routine = np.asarray(report_type) == ROUTINE_REPORT
+    order = np.lexsort((np.arange(len(cells)), times, routine, cells))
+    last_in_cell = np.r_[cells[order][1:] != cells[order][:-1], True]
+    chosen = order[last_in_cell]
+
+    # Every cell points at the row it takes its values from; empty cells borrow the previous filled cell's row.
+    # The first cell always has a report, because the grid starts at the earliest one.
+    rows = np.full(n_cells, -1, dtype=np.int64)
+    rows[cells[chosen]] = chosen
+    gap_filled = rows < 0
+    rows = rows[np.maximum.accumulate(np.where(gap_filled, 0, np.arange(n_cells)))]
+
+    values = df[columns].to_numpy(dtype="float64")[rows]
+    report = np.where(gap_filled, None, np.asarray(report_type, dtype=object)[rows])
+    observed = times[rows]
+
+    labels = start.to_datetime64() + step.to_timedelta64() * np.arange(n_cells)
+    if np.any(observed > labels):
+        raise ValueError("hourly grid cell took a report from after its label")
+    return HourlyGrid(start, step, columns, values, gap_filled, report, observed)
@@ -0,0 +1,218 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+# Opt-in timing of the named stages of NOAA.py, historical_data.py, reason_data.py and the merge.
+# Every stage records its wall time, CPU time, peak memory above what was allocated when it started (tracemalloc)
+# and the rows it produced. Stages nest: a stage called inside another is recorded with its parent and depth.
+#   - @traced("NOAA.interpolate") on a function, or `with stage("history.parse_dates") as s: ...; s.rows = n`
+#   - off by default; then traced functions are called straight through and stage() hands back a shared no-op,
+#     one flag check per call
+#   - turn it on with enable(), `with tracing() as records:`, `--trace trace.json` on pipeline.main, or the
+#     environment variable WMU_TRACE=trace.json, which writes the trace and prints the summary when the process
+#     exits (WMU_TRACE_MEMORY=0 leaves out the memory)
+#   - write_trace(path) saves the records as json, summary() is the readable table
+# tracemalloc slows allocation-heavy stages down a few times, and imports made inside a stage many times more; it
+# doesn't see memory that pyarrow allocates outside Python either. enable(memory=False) keeps only times and rows.
+# CPU time is the process's, and the memory peak is the whole process's too, so stages running at the same time on
+# other threads (pipeline.run with several workers) add to each other's figures.
+
+TRACE_ENV = "WMU_TRACE"
+TRACE_MEMORY_ENV = "WMU_TRACE_MEMORY"
+
+_enabled = False
+_memory = False
+_started_tracemalloc = False
+_records = []
+_origin = time.perf_counter()
+_local = threading.local()
+
+
+def enabled():
+    return _enabled
+
+
+def enable(memory=True):
+    global _enabled, _memory, _started_tracemalloc
+    _memory = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    _enabled = True
+
+
+def disable():
+    global _enabled, _memory, _started_tracemalloc
+    _enabled = False
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+    _memory = False
+
+
+def reset():
+    global _origin
+    _records.clear()
+    _origin = time.perf_counter()
+
+
+def records():
+    return list(_records)
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _rows(result):
+    # parse_durations and the joins return (frame, extra); count the frame
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    return len(result) if isinstance(result, (pd.DataFrame, pd.Series)) else None
+
+
+class _Stage:
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+
+    def __enter__(self):
+        stack = _stack()
+        self.parent = stack[-1] if stack else None
+        self.memory = _memory and tracemalloc.is_tracing()
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Resetting the peak would lose the parent's, so hand it up first
+            if self.parent is not None and self.parent.memory:
+                self.parent.peak = max(self.parent.peak, peak)
+            tracemalloc.reset_peak()
+            self.start_bytes = self.peak = current
+        stack.append(self)
+        self.start = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        cpu_seconds = time.process_time() - self.cpu
+        peak_bytes = None
+        if self.memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            peak_bytes = self.peak - self.start_bytes
+            if self.parent is not None and self.parent.memory:
+                self.parent.peak = max(self.parent.peak, self.peak)
+        _stack().pop()
+        _records.append({"stage": self.name, "parent": self.parent.name if self.parent is not None else None,
+                         "depth": len(_stack()), "thread": threading.current_thread().name,
+                         "start": self.start - _origin, "seconds": seconds, "cpu_seconds": cpu_seconds,
+                         "peak_bytes": peak_bytes, "rows": self.rows,
+                         "error": exc_type.__name__ if exc_type is not None else None})
+        return False
+
+
+class _NoStage:
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+# A block of code as a stage. Set .rows on the object it hands back to record a row count.
+def stage(name):
+    return _Stage(name) if _enabled else _NO_STAGE
+
+
+# A function as a stage; the rows are those of the frame or series it returns.
+def traced(name):
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(name) as record:
+                result = func(*args, **kwargs)
+                record.rows = _rows(result)
+            return result
+        return wrapper
+    return decorate
+
+
+# Switch tracing on for a block, starting from an empty trace; the list it hands back fills in as stages finish
+class tracing:
+    def __init__(self, memory=True):
+        self.memory = memory
+
+    def __enter__(self):
+        self.was_enabled = _enabled
+        reset()
+        enable(self.memory)
+        return _records
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.was_enabled:
+            disable()
+        return False
+
+
+def trace_frame(trace=None):
+    columns = ["stage", "parent", "depth", "thread", "start", "seconds", "cpu_seconds", "peak_bytes", "rows", "error"]
+    return pd.DataFrame(_records if trace is None else trace, columns=columns)
+
+
+# One line per stage, nested stages indented under their parent, in the order they started. Stages running at the
+# same time on other threads are kept apart, each under the stage it was called from.
+# Stages that ran more than once from the same parent are added up (times) or the largest kept (peak, rows).
+def summary(trace=None):
+    df = trace_frame(trace)
+    if df.empty:
+        return "no stages were traced"
+    # Within a thread the stages are strictly nested, so ordered by start every stage follows its parent
+    df = df.sort_values(["thread", "start"], kind="stable")
+    df["root"] = df["start"].where(df["depth"] == 0).groupby(df["thread"]).ffill()
+    df = df.sort_values(["root", "start"], kind="stable")
+    df["peak_bytes"] = df["peak_bytes"].astype(float)
+    df["rows"] = df["rows"].astype(float)
+    table = df.groupby(["stage", "parent", "depth"], sort=False, dropna=False).agg(
+        calls=("seconds", "size"), seconds=("seconds", "sum"), cpu_seconds=("cpu_seconds", "sum"),
+        peak_MB=("peak_bytes", "max"), rows=("rows", "max")).reset_index()
+    table["peak_MB"] = table["peak_MB"] / 1024 ** 2
+    table["rows"] = table["rows"].astype("Int64")
+    names = ["  " * depth + name for name, depth in zip(table["stage"], table["depth"])]
+    width = max(map(len, names))
+    table["stage"] = [name.ljust(width) for name in names]
+    table = table.drop(columns=["parent", "depth"])
+    return table.to_string(index=False, float_format="%.3f", na_rep="-", justify="left")
+
+
+def write_trace(path, trace=None):
+    with open(path, "w") as f:
+        json.dump({"created": pd.Timestamp.now().isoformat(timespec="seconds"), "argv": sys.argv,
+                   "records": _records if trace is None else trace}, f, indent=1)
+    return path
+
+
+def _write_at_exit(path):
+    if _records:
+        write_trace(path)
+        print(summary(), file=sys.stderr)
+        print(f"trace written to {path}", file=sys.stderr)
+
+
+if os.environ.get(TRACE_ENV):
+    enable(memory=os.environ.get(TRACE_MEMORY_ENV, "1") != "0")
+    atexit.register(_write_at_exit, os.environ[TRACE_ENV])
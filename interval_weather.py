@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from rolling_features import range_reduce, sparse_table
+
+# Weather aggregated over a window around every event, by default the whole down interval [downed, upped].
+# The window can be moved with offsets from either bound, e.g. the 24 hours before downed is
+# start_col="downed", end_col="downed", start_offset="-24h".
+#
+# Every aggregate comes from arrays built once over the weather series, indexed with searchsorted on the window
+# bounds of all events at once:
+#   - sum / count / mean of the observations inside the window: prefix sums
+#   - min / max: the sparse tables from rolling_features
+#   - time_mean and hours_below / hours_above a threshold: the integral of the step function that holds each
+#     observation until the next one, also a prefix sum, cut exactly at the window bounds
+# Windows are clipped to the weather series; "weather hours" says how much of each window it covered.
+# NaN observations are skipped. Events without upped end at downed + duration, like fleet_availability.
+#
+# The cleaned NOAA frame has specials (FM-16) between the routine reports and their precipitation is the running
+# total of the hour, so a precipitation "sum" should be taken over the hourly grid (NOAA.get_hourly_grid().to_frame()).
+
+# output column: (weather column, statistic) or (weather column, statistic, threshold)
+AGGREGATIONS = {
+    "mean temperature": ("temperature", "time_mean"),
+    "min temperature": ("temperature", "min"),
+    "max wind speed": ("wind_speed", "max"),
+    "max gust speed": ("gust_speed", "max"),
+    "total precipitation": ("precipitation", "sum"),
+    "mean humidity": ("humidity", "time_mean"),
+    "hours visibility below 3": ("visibility", "hours_below", 3),
+}
+
+HOUR = np.timedelta64(1, "h").astype("timedelta64[ns]").astype(np.int64)
+
+
+def _weather_times(weather, date_col):
+    if date_col in weather:
+        return weather[date_col].to_numpy(dtype="datetime64[ns]")
+    return weather.index.to_numpy(dtype="datetime64[ns]")
+
+
+def _window_bounds(events, start_col, end_col, start_offset, end_offset):
+    start = events[start_col].to_numpy(dtype="datetime64[ns]")
+    end = events[end_col].to_numpy(dtype="datetime64[ns]")
+    if end_col == "upped" and "duration" in events:
+        end = np.where(np.isnat(end), events["downed"].to_numpy(dtype="datetime64[ns]")
+                       + events["duration"].to_numpy(dtype="timedelta64[ns]"), end)
+    return (start + pd.Timedelta(start_offset).to_timedelta64(), end + pd.Timedelta(end_offset).to_timedelta64())
+
+
+# Integral, in value x hours, of the step function through (times, values) from times[0] up to each point
+def _step_integral(times, values, points):
+    hours = np.diff(times).astype(np.int64) / HOUR
+    prefix = np.r_[0, np.cumsum(values[:-1] * hours)]
+    k = np.maximum(np.searchsorted(times, points, side="right") - 1, 0)
+    return prefix[k] + values[k] * (points - times[k]).astype(np.int64) / HOUR
+
+
+def interval_weather(events, weather, aggregations=AGGREGATIONS, start_col="downed", end_col="upped",
+                     start_offset="0h", end_offset="0h", date_col="DATE"):
+    times = _weather_times(weather, date_col)
+    if len(times) > 1 and (np.diff(times) < np.timedelta64(0)).any():
+        raise ValueError(f"{date_col} must be sorted")
+
+    start, end = _window_bounds(events, start_col, end_col, start_offset, end_offset)
+    valid_window = ~(np.isnat(start) | np.isnat(end)) & (end >= start)
+    # Windows entirely before or after the weather get NaN, not the first or last observation
+    overlaps = valid_window & (end >= times[0]) & (start <= times[-1])
+    a = np.clip(np.where(valid_window, start, times[0]), times[0], times[-1])
+    b = np.clip(np.where(valid_window, end, times[0]), times[0], times[-1])
+
+    # Observations with a <= DATE <= b
+    first = np.searchsorted(times, a, side="left")
+    last = np.searchsorted(times, b, side="right")
+    max_length = max(int((last - first).max()), 1) if len(first) else 1
+
+    out = {"weather hours": np.where(valid_window, np.where(overlaps, (b - a).astype(np.int64) / HOUR, 0), np.nan)}
+    tables = {}
+    for name, (column, stat, *threshold) in aggregations.items():
+        values = weather[column].to_numpy(dtype="float64")
+        valid = ~np.isnan(values)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if stat in ("sum", "count", "mean"):
+                count = np.r_[0, np.cumsum(valid)]
+                prefix = np.r_[0, np.cumsum(np.where(valid, values, 0))]
+                n = (count[last] - count[first]).astype("float64")
+                total = np.where(n > 0, prefix[last] - prefix[first], np.nan)
+                result = {"count": n, "sum": total, "mean": total / n}[stat]
+
+            elif stat in ("min", "max"):
+                if (column, stat) not in tables:
+                    reduce = np.minimum if stat == "min" else np.maximum
+                    fill = np.inf if stat == "min" else -np.inf
+                    tables[column, stat] = (sparse_table(np.where(valid, values, fill), reduce, max_length), reduce)
+                table, reduce = tables[column, stat]
+                empty = last <= first
+                result = range_reduce(table, reduce, np.minimum(first, len(values) - 1), np.maximum(last, first + 1))
+                result = np.where(empty | np.isinf(result), np.nan, result)
+
+            elif stat in ("time_mean", "hours_below", "hours_above"):
+                if stat == "time_mean":
+                    weight = np.where(valid, values, 0)
+                elif stat == "hours_below":
+                    weight = (valid & (values < threshold[0])).astype("float64")
+                else:
+                    weight = (valid & (values > threshold[0])).astype("float64")
+                integral = _step_integral(times, weight, b) - _step_integral(times, weight, a)
+                if stat == "time_mean":
+                    covered = _step_integral(times, valid.astype("float64"), b) - _step_integral(
+                        times, valid.astype("float64"), a)
+                    # A window without width takes the observation in force at that time
+                    point = values[np.maximum(np.searchsorted(times, a, side="right") - 1, 0)]
+                    result = np.where(covered > 0, integral / covered, point)
+                else:
+                    result = integral
+
+            else:
+                raise ValueError(f"unknown statistic {stat!r} for {name!r}")
+
+        out[name] = np.where(overlaps, result, np.nan)
+
+    return pd.DataFrame(out, index=events.index)
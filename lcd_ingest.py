@@ -0,0 +1,59 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from NOAA import NUMERIC_LABELS, numeric_labels, read_NOAA_csv, to_float_and_interpolate, clean_NOAA_df
+
+# Ingest a whole archive of LCD exports (several stations, several years) at once.
+# Each csv is read and cleaned in its own worker process. The results are stacked, and every station is then
+# interpolated and rolled on its own, across year boundaries, also in the pool.
+
+
+# A directory, a glob pattern, or a list of csv paths
+def lcd_files(source):
+    if isinstance(source, (list, tuple)):
+        return sorted(source)
+    if os.path.isdir(source):
+        return sorted(glob.glob(os.path.join(source, "*.csv")))
+    return sorted(glob.glob(source))
+
+
+# Worker: report type filtering, METAR stripping and numeric coercion for one csv.
+def read_lcd_file(path):
+    df = read_NOAA_csv(path)
+    return pd.concat([df[["STATION", "DATE"]].astype({"STATION": str}), numeric_labels(df)], axis=1)
+
+
+# Worker: interpolation and rolling averages for one station's observations.
+def clean_station(args):
+    station, df, prev_days = args
+    df = df.sort_values("DATE", kind="stable")
+    cleaned = clean_NOAA_df(to_float_and_interpolate(df.set_index("DATE")[NUMERIC_LABELS]), prev_days)
+    cleaned.insert(0, "STATION", station)
+    return cleaned
+
+
+def ingest_lcd(source, prev_days=5, max_workers=None):
+    paths = lcd_files(source)
+    if not paths:
+        raise FileNotFoundError(f"No LCD csv files found in {source!r}")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        frames = list(pool.map(read_lcd_file, paths))
+        combined = pd.concat(frames, ignore_index=True)
+        groups = [(station, group, prev_days) for station, group in combined.groupby("STATION", sort=True)]
+        cleaned = list(pool.map(clean_station, groups))
+
+    df = pd.concat(cleaned, ignore_index=True)
+    df["STATION"] = df["STATION"].astype("category")
+    df.insert(1, "year", df["DATE"].dt.year.astype("int16"))
+
+    # Rows are grouped by station and sorted by date, so every (STATION, year) partition is one contiguous block
+    return df
+
+
+# Write the ingested frame as a parquet dataset with one directory per station and year.
+def write_partitions(df, directory):
+    df.to_parquet(directory, partition_cols=["STATION", "year"])
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# A declared schema for the NOAA Local Climatological Data (LCD) csv.
+# Only these columns are read; the other ~80 (daily, monthly and short duration summaries) are skipped.
+TEXT_COLUMNS = ["REM", "HourlyPresentWeatherType", "HourlySkyConditions"]
+CATEGORY_COLUMNS = ["STATION", "REPORT_TYPE"]
+
+# Hourly measurements and the compact dtype each one is stored in.
+NUMERIC_SCHEMA = {
+    "HourlyAltimeterSetting": "float32",
+    "HourlyDewPointTemperature": "Int16",
+    "HourlyDryBulbTemperature": "Int16",
+    "HourlyPrecipitation": "float32",
+    "HourlyRelativeHumidity": "Int16",
+    "HourlyVisibility": "float32",
+    "HourlyWindDirection": "Int16",
+    "HourlyWindGustSpeed": "Int16",
+    "HourlyWindSpeed": "Int16",
+}
+
+LCD_COLUMNS = ["STATION", "DATE", "REPORT_TYPE"] + list(NUMERIC_SCHEMA) + TEXT_COLUMNS
+
+# LCD values can carry a suffix or be a bare code:
+#   "T"      trace precipitation
+#   "0.02s"  suspect value
+#   "2.50V"  variable visibility
+#   "VRB"    variable wind direction
+#   "*"      missing
+# Each one is split into the number and a flag column named f"{col}_flag".
+VALUE_FLAG_PATTERN = r"^\s*(?P<value>[-+]?(?:\d+\.?\d*|\.\d+))?\s*(?P<flag>[A-Za-z*]+)?\s*$"
+
+# A trace of precipitation is less than 0.005 in, so it is counted as zero. The "T" flag keeps the distinction.
+TRACE_VALUE = 0.0
+
+
+# Split every numeric column into value and flag in one pass over all of the cells.
+# Plain numbers are converted in C by to_numeric; only the few cells left over go through the regex.
+def parse_value_flags(df, columns):
+    raw = pd.Series(df[columns].to_numpy(dtype=object).ravel(order="F"))
+    values = pd.to_numeric(raw, errors="coerce").to_numpy(dtype="float64", copy=True)
+    flags = np.full(len(raw), None, dtype=object)
+
+    leftover = raw.notna().to_numpy() & np.isnan(values)
+    if leftover.any():
+        parts = raw[leftover].astype(str).str.extract(VALUE_FLAG_PATTERN)
+        values[leftover] = pd.to_numeric(parts["value"], errors="coerce").to_numpy(dtype="float64")
+        flags[leftover] = parts["flag"].to_numpy(dtype=object, na_value=None)
+    values[(flags == "T") & np.isnan(values)] = TRACE_VALUE
+
+    n = len(df)
+    parsed = {}
+    for i, col in enumerate(columns):
+        parsed[col] = values[i * n:(i + 1) * n]
+        parsed[f"{col}_flag"] = pd.Series(flags[i * n:(i + 1) * n], dtype=str).astype("category").array
+
+    return pd.DataFrame(parsed, index=df.index)
+
+
+# Store a float column in the schema dtype. Integer columns fall back to float32 if a value isn't whole.
+def to_schema_dtype(values, dtype):
+    if dtype.startswith("Int"):
+        whole = values[~np.isnan(values)]
+        if np.all(whole == np.round(whole)):
+            return pd.array(values, dtype=dtype)
+        dtype = "float32"
+
+    return values.astype(dtype)
+
+
+def read_lcd(path, **read_csv_kwargs):
+    df = pd.read_csv(path, usecols=LCD_COLUMNS, dtype=str, **read_csv_kwargs)
+    return type_lcd_frame(df)
+
+
+# The same as read_lcd, but yields typed frames of at most chunksize rows.
+def iter_lcd(path, chunksize=100_000, **read_csv_kwargs):
+    with pd.read_csv(path, usecols=LCD_COLUMNS, dtype=str, chunksize=chunksize, **read_csv_kwargs) as reader:
+        for df in reader:
+            yield type_lcd_frame(df)
+
+
+# Turn the string columns from read_csv into the schema dtypes.
+def type_lcd_frame(df):
+    numeric_cols = list(NUMERIC_SCHEMA)
+    parsed = parse_value_flags(df, numeric_cols)
+
+    typed = pd.DataFrame(index=df.index)
+    typed["STATION"] = df["STATION"].str.strip().astype("category")
+    typed["DATE"] = pd.to_datetime(df["DATE"])
+    typed["REPORT_TYPE"] = df["REPORT_TYPE"].str.strip().astype("category")
+    for col, dtype in NUMERIC_SCHEMA.items():
+        typed[col] = to_schema_dtype(parsed[col], dtype)
+        typed[f"{col}_flag"] = parsed[f"{col}_flag"]
+    for col in TEXT_COLUMNS:
+        typed[col] = df[col]
+
+    return typed
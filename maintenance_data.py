@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+
+# Access to the two maintenance exports from the RMS.
+# Nothing is read on import. Each export is read the first time something asks for it, and everything built from
+# it (the exports themselves, history(), downed(), the event table, the fleet totals) is kept for the rest of the
+# process. Every call checks the files' modification time and size; if either export has changed, all of it is
+# dropped and rebuilt on demand.
+
+HISTORY_CSV = "Resource Down History.csv"
+REASON_CSV = "Resources Downed by Reason.csv"
+
+
+class MaintenanceData:
+    def __init__(self, history_path=HISTORY_CSV, reason_path=REASON_CSV):
+        self.history_path = history_path
+        self.reason_path = reason_path
+        self._stages = {}
+        self._stamp = None
+
+    def stamp(self):
+        return tuple((stat.st_mtime_ns, stat.st_size) for stat in map(os.stat, (self.history_path, self.reason_path)))
+
+    # Build a stage once and hand back a copy of frames, so callers can't change what is cached
+    def stage(self, key, build):
+        stamp = self.stamp()
+        if stamp != self._stamp:
+            self._stages.clear()
+            self._stamp = stamp
+        if key not in self._stages:
+            self._stages[key] = build()
+        value = self._stages[key]
+        return value.copy() if isinstance(value, (pd.DataFrame, pd.Series)) else value
+
+    def clear(self):
+        self._stages.clear()
+        self._stamp = None
+
+    def history_export(self):
+        return self.stage("history export", lambda: pd.read_csv(self.history_path))
+
+    def reason_export(self):
+        return self.stage("reason export", lambda: pd.read_csv(self.reason_path))
+
+    # Average down-time for the fleet of SR20s, as reported by the RMS
+    def fleet_average_down_time(self):
+        return self.stage("fleet average down time",
+                          lambda: pd.to_timedelta(self.history_export()["avg down time per resource"].iloc[0]))
+
+    # Total down-time for the fleet of SR20s, as reported by the RMS
+    def total_down_time(self):
+        return self.stage("total down time",
+                          lambda: pd.to_timedelta(self.history_export()["total down time"].iloc[1]))
+
+
+maintenance = MaintenanceData()
@@ -0,0 +1,263 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# pyarrow is used when it is installed, see column_regex.py
+from column_regex import extract, matched, pa, pc
+
+# Whole-column METAR decoding.
+# Each field is pulled out of every report at once, and comes back as a number
+# instead of a display string like "020° at 09 kt".
+
+WIND_PATTERN = r"\b(?:(?P<wind_dir>\d{3})|VRB)(?P<wind_speed>\d{2,3})(?:G(?P<wind_gust>\d{2,3}))?KT\b"
+# Visibility can be fractional: "10SM", "2 1/2SM", "1/2SM", and "M1/4SM" for less than a quarter mile.
+VISIBILITY_PATTERN = (r"(?:^|\s)(?:(?P<vis_part>\d)\s)?(?P<vis_less>M)?"
+                      r"(?:(?P<vis_num>\d)/(?P<vis_den>\d{1,2})|(?P<vis_whole>\d{1,2}))SM\b")
+TEMP_DEW_PATTERN = r"\s(?P<temperature>M?\d{2})/(?P<dew_point>M?\d{2})\b"
+ALTIMETER_PATTERN = r"\bA(?P<altimeter>\d{4})\b"
+
+# Everything after RMK is remarks, which can contain groups that look like the ones above.
+REMARKS_PATTERN = r" RMK.*$"
+
+METAR_COLUMNS = ["wind_dir", "wind_speed", "wind_gust", "visibility", "visibility_less_than",
+                 "temperature", "dew_point", "altimeter"]
+
+
+def metar_body(reports):
+    if pa is None:
+        return reports.astype("string").str.replace(REMARKS_PATTERN, "", regex=True)
+
+    body = pa.array(reports, type=pa.string(), from_pandas=True)
+    return pc.replace_substring_regex(body, REMARKS_PATTERN, "")
+
+
+# Convert an extracted string column to float64. An M in front of a number means minus, e.g. "M05".
+def number(strings):
+    if pa is None:
+        return pd.to_numeric(strings.str.replace("M", "-", regex=False), errors="coerce").to_numpy(dtype="float64")
+
+    strings = pc.replace_substring(strings, "M", "-")
+    strings = pc.if_else(pc.equal(strings, ""), pa.scalar(None, pa.string()), strings)
+    return pc.cast(strings, pa.float64()).to_numpy(zero_copy_only=False)
+
+
+# Visibility in statute miles from the parts of VISIBILITY_PATTERN, e.g. "2 1/2SM" -> 2.5.
+# The M (less than) prefix keeps the bound itself as the value, so "M1/4SM" -> 0.25.
+def visibility_miles(vis):
+    whole = number(vis["vis_whole"])
+    fraction = np.nan_to_num(number(vis["vis_part"])) + number(vis["vis_num"]) / number(vis["vis_den"])
+    return np.where(np.isnan(whole), fraction, whole)
+
+
+def decode_metar_frame(reports):
+    body = metar_body(reports)
+
+    wind = extract(body, WIND_PATTERN)
+    vis = extract(body, VISIBILITY_PATTERN)
+    temp_dew = extract(body, TEMP_DEW_PATTERN)
+    altimeter = extract(body, ALTIMETER_PATTERN)
+
+    decoded = pd.DataFrame(index=reports.index)
+    # VRB has no heading, so wind_dir is NaN
+    decoded["wind_dir"] = number(wind["wind_dir"]).astype("float32")
+    decoded["wind_speed"] = number(wind["wind_speed"]).astype("float32")
+    decoded["wind_gust"] = number(wind["wind_gust"]).astype("float32")
+    decoded["visibility"] = visibility_miles(vis).astype("float32")
+    decoded["visibility_less_than"] = matched(vis["vis_less"])
+    decoded["temperature"] = number(temp_dew["temperature"]).astype("float32")
+    decoded["dew_point"] = number(temp_dew["dew_point"]).astype("float32")
+    decoded["altimeter"] = (number(altimeter["altimeter"]) / 100).astype("float32")
+
+    return decoded
+
+
+# The display strings decode_metar used to return, built from the numeric columns.
+def format_metar_frame(decoded):
+    def text(mask, fmt, *columns):
+        out = np.full(len(decoded), None, dtype=object)
+        values = [decoded[col].to_numpy(dtype="float64")[mask] for col in columns]
+        out[mask] = [fmt(*v) for v in zip(*values)]
+        return out
+
+    def present(*columns):
+        return decoded[list(columns)].notna().all(axis=1).to_numpy()
+
+    def degrees(v):
+        return f"{v:03.0f} °C" if v < 0 else f"{v:02.0f} °C"
+
+    formatted = pd.DataFrame(index=decoded.index)
+    formatted["wind"] = text(present("wind_dir", "wind_speed"), lambda d, s: f"{d:03.0f}° at {s:02.0f} kt",
+                             "wind_dir", "wind_speed")
+    formatted["visibility"] = text(present("visibility"), lambda v: f"{v:g} SM", "visibility")
+    formatted["temperature"] = text(present("temperature"), degrees, "temperature")
+    formatted["dew_point"] = text(present("dew_point"), degrees, "dew_point")
+    formatted["pressure"] = text(present("altimeter"), lambda v: f"{v:.2f} inHg", "altimeter")
+
+    return formatted
+
+
+# Full METAR grammar.
+# decode_metar_frame above covers the handful of numeric fields we started with. parse_metar_reports reads every
+# group we see in the feed: gusts, VRB and 3-digit winds, variable wind sectors, fractional visibility
+# ("1 1/2SM", "M1/4SM"), present weather, cloud layers and the tenths-of-a-degree T group in the remarks.
+# Each report is split into tokens once, and every token is matched against a single compiled pattern
+# whose named alternative tells us what kind of group it is.
+# This is a per-report Python loop, slower than decode_metar_frame; use it for fidelity, not throughput.
+PHENOMENA = r"(?:DZ|RA|SN|SG|IC|PL|GR|GS|UP|BR|FG|FU|VA|DU|SA|HZ|PY|PO|SQ|FC|SS|DS)"
+DESCRIPTORS = r"(?:MI|PR|BC|DR|BL|SH|TS|FZ)"
+
+BODY_TOKEN = re.compile("|".join([
+    r"(?P<wind>(?:(?P<wind_dir>\d{3})|(?P<vrb>VRB))(?P<wind_speed>\d{2,3})(?:G(?P<wind_gust>\d{2,3}))?KT)",
+    r"(?P<wind_sector>(?P<sector_from>\d{3})V(?P<sector_to>\d{3}))",
+    r"(?P<visibility>(?P<vis_less>M)?(?:(?P<vis_num>\d)/(?P<vis_den>\d{1,2})|(?P<vis_whole>\d{1,3}))SM)",
+    r"(?P<vis_part>\d)",
+    rf"(?P<weather>(?:[-+]|VC)?(?:{DESCRIPTORS}{PHENOMENA}*|{PHENOMENA}+))",
+    r"(?P<cloud>(?P<cover>FEW|SCT|BKN|OVC|VV)(?P<base>\d{3}|///)(?:CB|TCU)?)",
+    r"(?P<clear>CLR|SKC|NSC|NCD)",
+    r"(?P<temp_dew>(?P<temp>M?\d{2})/(?P<dew>M?\d{2})?)",
+    r"(?P<altimeter>A(?P<inches>\d{4}))",
+]))
+T_GROUP = re.compile(r"T(?P<t_sign>[01])(?P<t_val>\d{3})(?:(?P<d_sign>[01])(?P<d_val>\d{3}))?")
+
+MAX_CLOUD_LAYERS = 4
+CEILING_COVERS = {"BKN", "OVC", "VV"}
+# ASOS only reports clouds up to 12,000 ft, so CLR or a sky without a ceiling means no ceiling below that.
+NO_CEILING_FT = 12000.0
+# Sky cover in eighths, the same scale LCD uses in HourlySkyConditions ("OVC:08 18")
+OKTAS = {"CLR": 0, "SKC": 0, "NSC": 0, "NCD": 0, "FEW": 2, "SCT": 4, "BKN": 7, "OVC": 8, "VV": 8}
+
+WEATHER_GROUPS = {
+    "rain": ("RA", "DZ"),
+    "snow": ("SN", "SG", "PL", "GR", "GS", "IC"),
+    "fog": ("FG", "BR", "HZ"),
+    "thunder": ("TS",),
+}
+
+GRAMMAR_COLUMNS = (["report_type", "station", "wind_dir", "wind_variable", "wind_speed", "wind_gust",
+                    "wind_sector_from", "wind_sector_to", "visibility", "visibility_less_than", "weather"]
+                   + list(WEATHER_GROUPS)
+                   + [f"cloud_{part}_{i}" for i in range(1, MAX_CLOUD_LAYERS + 1) for part in ("cover", "base")]
+                   + ["sky_cover", "ceiling", "temperature", "dew_point", "temperature_precise",
+                      "dew_point_precise", "altimeter"])
+
+
+def celsius(text):
+    return -float(text[1:]) if text.startswith("M") else float(text)
+
+
+def tenths(sign, value):
+    return (-1 if sign == "1" else 1) * int(value) / 10
+
+
+# Decode one report into row, a dict of column -> value that starts out empty.
+def parse_metar(report, row):
+    tokens = report.split()
+    if tokens and tokens[0] in ("METAR", "SPECI"):
+        row["report_type"] = tokens.pop(0)
+    if tokens and tokens[0] == "COR":
+        tokens.pop(0)
+    if tokens:
+        row["station"] = tokens[0]
+
+    layers, weather, vis_part = 0, [], None
+    for i, token in enumerate(tokens[1:], start=1):
+        if token == "RMK":
+            for remark in tokens[i + 1:]:
+                t = T_GROUP.fullmatch(remark)
+                if t:
+                    row["temperature_precise"] = tenths(t["t_sign"], t["t_val"])
+                    if t["d_val"]:
+                        row["dew_point_precise"] = tenths(t["d_sign"], t["d_val"])
+                    break
+            break
+
+        m = BODY_TOKEN.fullmatch(token)
+        if m is None:
+            vis_part = None
+            continue
+        kind = m.lastgroup
+
+        if kind == "wind":
+            row["wind_variable"] = m["vrb"] is not None
+            if m["wind_dir"]:
+                row["wind_dir"] = float(m["wind_dir"])
+            row["wind_speed"] = float(m["wind_speed"])
+            if m["wind_gust"]:
+                row["wind_gust"] = float(m["wind_gust"])
+        elif kind == "wind_sector":
+            row["wind_sector_from"] = float(m["sector_from"])
+            row["wind_sector_to"] = float(m["sector_to"])
+        elif kind == "visibility":
+            if m["vis_whole"]:
+                vis = float(m["vis_whole"])
+            else:
+                vis = int(m["vis_num"]) / int(m["vis_den"]) + (vis_part or 0)
+            row["visibility"] = vis
+            row["visibility_less_than"] = m["vis_less"] is not None
+        elif kind == "weather":
+            weather.append(token)
+        elif kind == "cloud" and layers < MAX_CLOUD_LAYERS:
+            layers += 1
+            cover = m["cover"]
+            row[f"cloud_cover_{layers}"] = cover
+            if m["base"] != "///":
+                base = int(m["base"]) * 100.0
+                row[f"cloud_base_{layers}"] = base
+                if cover in CEILING_COVERS and "ceiling" not in row:
+                    row["ceiling"] = base
+            row["sky_cover"] = max(row.get("sky_cover", 0), OKTAS[cover])
+        elif kind == "clear":
+            row["sky_cover"] = 0
+        elif kind == "temp_dew":
+            row["temperature"] = celsius(m["temp"])
+            if m["dew"]:
+                row["dew_point"] = celsius(m["dew"])
+        elif kind == "altimeter":
+            row["altimeter"] = int(m["inches"]) / 100
+
+        # A lone digit is the whole part of a fractional visibility, e.g. the 1 in "1 1/2SM"
+        vis_part = int(token) if kind == "vis_part" else None
+
+    if weather:
+        row["weather"] = " ".join(weather)
+        # Test each token on its own; joined together, "FG RA" would contain the GR of hail.
+        for group, phenomena in WEATHER_GROUPS.items():
+            row[group] = any(code in token for token in weather for code in phenomena)
+    elif "station" in row:
+        for group in WEATHER_GROUPS:
+            row[group] = False
+
+    return row
+
+
+# Decode a column of reports into one column per field, on the same index.
+def parse_metar_reports(reports):
+    rows = [parse_metar(report, {}) if isinstance(report, str) else {} for report in reports]
+    parsed = pd.DataFrame.from_records(rows, columns=GRAMMAR_COLUMNS)
+    parsed.index = reports.index
+
+    for col in GRAMMAR_COLUMNS:
+        if col in ("report_type", "station") or col.startswith("cloud_cover"):
+            parsed[col] = parsed[col].astype("category")
+        elif col == "weather":
+            parsed[col] = parsed[col].astype("string")
+        elif col in WEATHER_GROUPS or col in ("wind_variable", "visibility_less_than"):
+            parsed[col] = parsed[col].astype("boolean")
+        else:
+            parsed[col] = parsed[col].astype("float32")
+
+    return parsed
+
+
+# Numeric stand-ins for HourlySkyConditions and HourlyPresentWeatherType: sky cover in oktas, ceiling in feet,
+# and 1.0 / 0.0 for each weather group. Reports without a ceiling get NO_CEILING_FT.
+def sky_and_weather(parsed):
+    out = pd.DataFrame(index=parsed.index)
+    out["sky_cover"] = parsed["sky_cover"].astype("float64")
+    out["ceiling"] = parsed["ceiling"].astype("float64").mask(out["sky_cover"].notna() & parsed["ceiling"].isna(),
+                                                            NO_CEILING_FT)
+    for group in WEATHER_GROUPS:
+        out[group] = parsed[group].astype("Float64").to_numpy(dtype="float64", na_value=np.nan)
+
+    return out
@@ -0,0 +1,171 @@
+import argparse
+import hashlib
+import inspect
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+import instrumentation
+from disk_cache import DiskCache, code_fingerprint, file_fingerprint
+
+# A small runner for analysis scripts. A script declares its stages: a function, the stages whose results it takes
+# (in order, as positional arguments), its parameters, and the files and modules it reads.
+# Every stage gets a key: a hash of its function's source, parameters, files, modules and the keys of its inputs.
+# So a stage is up to date when nothing it depends on has changed, however far upstream the change was.
+#   - Stages that return a DataFrame are saved in the cache under their key and reloaded instead of rebuilt,
+#     and only when a stage that has to run needs them.
+#   - Stages that return None (charts, reports) leave an empty marker frame, so they are skipped until their
+#     key changes, or one of the files listed in its outputs is missing. always=True runs a stage every time.
+#   - Independent stages run at the same time in a thread pool. Stages marked exclusive (anything using pyplot,
+#     which keeps global state) run one at a time.
+# run() reports every stage with what happened to it and how long it took.
+
+PIPELINE_CACHE_DIR = ".pipeline_cache"
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), params=None, files=(), modules=(), outputs=(), always=False,
+                 exclusive=False):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.params = params or {}
+        self.files = list(files)
+        self.modules = list(modules)
+        self.outputs = list(outputs)
+        self.always = always
+        self.exclusive = exclusive
+
+
+class Pipeline:
+    def __init__(self, stages, cache=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache = DiskCache(PIPELINE_CACHE_DIR) if cache is None else cache
+        self._exclusive = threading.Lock()
+
+    # The stages the targets need, upstream first
+    def order(self, targets):
+        ordered, seen = [], set()
+
+        def visit(name):
+            if name in seen:
+                return
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage {name!r}")
+            seen.add(name)
+            for dependency in self.stages[name].inputs:
+                visit(dependency)
+            ordered.append(name)
+
+        for name in targets:
+            visit(name)
+        return ordered
+
+    def keys(self, names):
+        files, keys = {}, {}
+        for name in names:
+            stage = self.stages[name]
+            for path in stage.files:
+                if path not in files:
+                    files[path] = file_fingerprint(path)
+            source = hashlib.blake2b(inspect.getsource(stage.func).encode(), digest_size=16).hexdigest()
+            keys[name] = self.cache.key(name, source, sorted(stage.params.items()),
+                                        [files[path] for path in stage.files],
+                                        code_fingerprint(*stage.modules) if stage.modules else None,
+                                        [keys[dependency] for dependency in stage.inputs])
+        return keys
+
+    def _execute(self, stage, key, args):
+        start = time.perf_counter()
+        if stage.exclusive:
+            with self._exclusive:
+                result = stage.func(*args, **stage.params)
+        else:
+            result = stage.func(*args, **stage.params)
+        if not stage.always:
+            if result is not None and not isinstance(result, pd.DataFrame):
+                raise TypeError(f"Stage {stage.name!r} returned {type(result).__name__}, not a DataFrame or None")
+            self.cache.put(key, pd.DataFrame() if result is None else result)
+        return result, "ran", time.perf_counter() - start
+
+    def _load(self, key):
+        start = time.perf_counter()
+        return self.cache.get(key), "loaded", time.perf_counter() - start
+
+    def up_to_date(self, stage, key):
+        return (not stage.always and self.cache.has(key)
+                and all(os.path.exists(path) for path in stage.outputs))
+
+    # Bring the targets up to date. force names stages to rebuild even if they are up to date.
+    # Returns the results that were loaded or built (always including the targets), and a frame of stage, status and
+    # seconds.
+    def run(self, targets, force=(), max_workers=2):
+        names = self.order(targets)
+        keys = self.keys(names)
+        to_run = {name for name in names if name in force or not self.up_to_date(self.stages[name], keys[name])}
+        to_load = ({dependency for name in to_run for dependency in self.stages[name].inputs} | set(targets)) - to_run
+
+        results, report = {}, {name: ("up to date", 0.0) for name in names}
+        pending = [name for name in names if name in to_run or name in to_load]
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while pending or running:
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if name in to_load:
+                        running[pool.submit(self._load, keys[name])] = name
+                    elif all(dependency in results for dependency in stage.inputs):
+                        args = [results[dependency] for dependency in stage.inputs]
+                        running[pool.submit(self._execute, stage, keys[name], args)] = name
+                    else:
+                        continue
+                    pending.remove(name)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    result, status, seconds = future.result()
+                    results[name] = result
+                    report[name] = (status, seconds)
+
+        timings = pd.DataFrame([(name, *report[name]) for name in names], columns=["stage", "status", "seconds"])
+        return results, timings
+
+
+def main(stages, default_targets, argv=None, description=None):
+    pipeline = Pipeline(stages)
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("targets", nargs="*", default=default_targets,
+                        help=f"stages to bring up to date (default: {' '.join(default_targets)})")
+    parser.add_argument("--force", nargs="*", metavar="STAGE",
+                        help="rebuild these stages even if they are up to date; no names means all")
+    parser.add_argument("--workers", type=int, default=2, help="stages to run at the same time")
+    parser.add_argument("--list", action="store_true", help="list the stages and exit")
+    parser.add_argument("--trace", metavar="JSON",
+                        help="record the time, memory and rows of the steps inside the stages into this file")
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="leave tracemalloc off while tracing; it slows the traced steps down")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for stage in stages:
+            print(f"{stage.name:24} <- {', '.join(stage.inputs) or '-'}")
+        return
+    if args.force is None:
+        force = set()
+    else:
+        force = set(args.force or pipeline.order(args.targets))
+    if args.trace:
+        instrumentation.reset()
+        instrumentation.enable(memory=not args.no_trace_memory)
+    start = time.perf_counter()
+    _, timings = pipeline.run(args.targets, force=force, max_workers=args.workers)
+    print(timings.to_string(index=False, float_format="%.2f"))
+    if args.trace:
+        instrumentation.disable()
+        print(instrumentation.summary())
+        print(f"trace written to {instrumentation.write_trace(args.trace)}")
+    print(f"total {time.perf_counter() - start:.2f} s")
@@ -1,11 +1,49 @@
 import pandas as pd
 
+from durations import parse_durations
+from instrumentation import stage, traced
+from maintenance_data import maintenance
+from reason_taxonomy import reason_classifier
 
-df = pd.read_csv("Resources Downed by Reason.csv")
-df = df.drop(df.index[0]) # Sold aircraft
 
+# Some of the reasons are redundant, these are the ones kept.
+# downed() classifies with reason_taxonomy.reason_classifier, which gives the same labels; map_reason is
+# the per-row reference it is checked against (benchmarks/bench_reasons.py).
+acceptable = ['50 Hr Inspect', 'Engine', 'Propeller',
+              'Avionics', 'Airframe', 'Annual Inspect',
+              'Airframe Damage', 'Hangar', '100 Hr Inspect', "Unspecified"]
+
+acceptable_lower = {word.lower(): word for word in acceptable}  # For stability
+
+
+def map_reason(reason):
+    reason_lower = str(reason).lower()
+    for label in acceptable_lower:
+        if label in reason_lower:
+            return next(original for original in acceptable if original.lower() == label)
+    return "Unspecified"
+
+
+# "downed reason" and "eta squawk" complete each other: one text per event, with "Squawk" read as "Unspecified"
+def combine_reason(downed_reason, eta_squawk):
+    return ((downed_reason.fillna("").str.strip()
+             + " " +
+             eta_squawk.fillna("").str.strip())
+            .str.replace(r"Squawk", "Unspecified", regex=True).str.strip()
+            .str.replace(r"\s+", " ", regex=True).str.strip())
+
+
+# Read once and kept, see maintenance_data.py
 def downed():
-    downed_df = df.copy()
+    return maintenance.stage("downed", build_downed)
+
+
+@traced("downed")
+def build_downed():
+    with stage("downed.read_export") as s:
+        downed_df = maintenance.reason_export()
+        s.rows = len(downed_df)
+    downed_df = downed_df.drop(downed_df.index[0]) # Sold aircraft
     # print(downed_df['day'].unique(), "\n") # This is all the day the data was queried
     # print(downed_df['time'].unique(), "\n") # This is all the time the data was queried
     downed_df = downed_df.iloc[:, :6]
@@ -13,11 +51,7 @@ def downed():
     # print(downed_df["downed reason"].head(10), downed_df["eta squawk"].head(10)) # These columns complete each other
     # Concatenating columns
     # Replacing NaN with nice string values
-    downed_df["reason"] = ((downed_df["downed reason"].fillna("").str.strip()
-                           + " " +
-                           downed_df["eta squawk"].fillna("").str.strip())
-                           .str.replace(r"Squawk", "Unspecified", regex=True).str.strip()
-                           .str.replace(r"\s+", " ", regex=True).str.strip())
+    downed_df["reason"] = combine_reason(downed_df["downed reason"], downed_df["eta squawk"])
 
 
     #------------------------------------------------------------------------------------------------------------------#
@@ -32,44 +66,28 @@ def downed():
     #  '100 Hr Inspect' 'Inspection Engine' 'Inspection Other'
     #  'Inspection Avionics']
 
-    # Some of these are redundant
-
-    acceptable = ['50 Hr Inspect', 'Engine', 'Propeller',
-                  'Avionics', 'Airframe', 'Annual Inspect',
-                  'Airframe Damage', 'Hangar', '100 Hr Inspect', "Unspecified"]
-
-    acceptable_lower = {word.lower(): word for word in acceptable}  # For stability
-
-    def map_reason(reason):
-        reason_lower = str(reason).lower()
-        for label in acceptable_lower:
-            if label in reason_lower:
-                return next(original for original in acceptable if original.lower() == label)
-        return "Unspecified"
-
-    downed_df["reason"] = downed_df["reason"].apply(map_reason)
+    # Some of these are redundant, see acceptable above
+    with stage("downed.classify_reasons") as s:
+        downed_df["reason"] = reason_classifier.classify(downed_df["reason"]).astype(str)
+        s.rows = len(downed_df)
     downed_df = downed_df.drop(["downed reason", "eta squawk"], axis=1)  # Don't need these anymore
     #------------------------------------------------------------------------------------------------------------------#
-    from historical_data import parse_mixed_time
-
 
-    downed_df["downed"] = pd.to_datetime(downed_df['downed'])
-    downed_df["upped"] = pd.to_datetime(downed_df['upped'])
-    downed_df['duration'] = downed_df['duration'].astype(str).str.replace(",", "", regex=False)  # Removing commas
-    downed_df["reported duration"] = [pd.Timedelta(hours=h) for h in downed_df["duration"].astype(float)]
+    with stage("downed.parse_dates") as s:
+        downed_df["downed"] = pd.to_datetime(downed_df['downed'])
+        downed_df["upped"] = pd.to_datetime(downed_df['upped'])
+        s.rows = len(downed_df)
+    with stage("downed.parse_durations") as s:
+        downed_df["reported duration"], failures = parse_durations(downed_df["duration"], unit="hours")  # Decimal hours, e.g. "58,293.10"
+        s.rows = len(downed_df)
+    downed_df.attrs["duration failures"] = failures["value"].tolist()
 
     # This column is the more precisely calculated duration
     downed_df["duration"] = downed_df["upped"] - downed_df["downed"]
 
     # print(downed_df["duration"].iloc[58]) # There are some rows where the upped time is missing
-    def complete_duration ():
-        nans = downed_df[downed_df["duration"].isna()].index  # index of NaN values [57, 132, 266, 441, 727, 861, 900]
-        for i in nans:
-            downed_df.at[i, "duration"] = downed_df.at[i, "reported duration"]  # Filling NaN from "reported duration"
-            downed_df["downed"] = pd.to_datetime(downed_df['downed'])
-        return downed_df["duration"]
-
-    downed_df["duration"] = complete_duration()
+    # Filling NaN from "reported duration"
+    downed_df["duration"] = downed_df["duration"].fillna(downed_df["reported duration"])
 
     return (downed_df)
 
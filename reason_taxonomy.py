@@ -0,0 +1,75 @@
+import re
+
+import pandas as pd
+
+# Maintenance reasons as an ordered taxonomy: (label, patterns), case-insensitive regexes.
+# A text gets the first label in the list with a pattern anywhere in it, not the leftmost match,
+# so "Airframe Damage" is classified as "Airframe" just like reason_data.map_reason does.
+#
+# All patterns are compiled into one regex of lookaheads, (?=(?P<g0>...)|(?P<g1>...)|...). It matches at
+# every position and reports the highest-priority label starting there, so one scan of the text finds the
+# best label. Each distinct text is scanned once and the rows take its label by code, so a column of
+# millions of rows costs only as much as its distinct values.
+
+REASON_TAXONOMY = [
+    ("50 Hr Inspect", [r"50 hr inspect"]),
+    ("Engine", [r"engine"]),
+    ("Propeller", [r"propeller"]),
+    ("Avionics", [r"avionics"]),
+    ("Airframe", [r"airframe"]),
+    ("Annual Inspect", [r"annual inspect"]),
+    ("Airframe Damage", [r"airframe damage"]),
+    ("Hangar", [r"hangar"]),
+    ("100 Hr Inspect", [r"100 hr inspect"]),
+    ("Unspecified", [r"unspecified"]),
+]
+
+# What the squawk and comments say, e.g. "boost pump" or "mag check". Same rules as above.
+SUBCATEGORY_TAXONOMY = [
+    ("Timed out", [r"\btime", r"\bdown(?:ed)? for hours\b", r"^hours$"]),
+    ("Inspection", [r"\binsp", r"#\d", r"\bphase\b", r"\b\d+ h(?:ou)?r\b"]),
+    ("Magneto", [r"\bmag(?:neto)?s?\b"]),
+    ("Fuel pump", [r"boost pump", r"fuel pump"]),
+    ("Oil", [r"\boil\b", r"dipstick"]),
+    ("Fuel", [r"\bfuel\b", r"\bsump", r"gascolator"]),
+    ("Engine temperature", [r"\bcht\b", r"\begt\b"]),
+    ("Electrical", [r"\balt(?:ernator|inator)?\s*\d?\b", r"electrical", r"\bbatt"]),
+    ("Autopilot", [r"auto ?pilot", r"^ap$"]),
+    ("Avionics", [r"\bgps\b", r"transponder", r"a?dahrs|\bahrs\b", r"\bcoms?\b", r"radio", r"\bifd\b", r"tcas",
+                  r"headphone", r"tachometer", r"pitot", r"airspeed", r"attitude", r"avionics"]),
+    ("Propeller", [r"\bprop"]),
+    ("Engine", [r"engine", r"\brpm\b", r"rough", r"sputter", r"\bidle\b", r"\bcyl", r"starter",
+                r"crank", r"would not start", r"vibration", r"shaking"]),
+    ("Flight controls", [r"\bflaps?\b", r"\btrim\b", r"rudder", r"aileron", r"elevator"]),
+    ("Landing gear", [r"\btire", r"wheel", r"\bnlg\b", r"strut", r"shimmy", r"brake"]),
+    ("Lights", [r"\blight", r"strobe"]),
+    ("Airframe", [r"paint", r"\bdoor", r"fairing", r"\bwing", r"glare ?shield", r"strike", r"hard landing",
+                  r"airframe", r"screw"]),
+]
+
+
+class ReasonClassifier:
+    def __init__(self, taxonomy, default="Unspecified"):
+        self.labels = [label for label, _ in taxonomy]
+        self.default = default
+        alternatives = "|".join(f"(?P<g{i}>{'|'.join(patterns)})" for i, (_, patterns) in enumerate(taxonomy))
+        self.pattern = re.compile(f"(?=(?:{alternatives}))", re.IGNORECASE)
+        self.categories = self.labels + ([] if default in self.labels else [default])
+
+    # Label of one text
+    def classify_one(self, text):
+        if not isinstance(text, str):
+            return self.default
+        found = [int(m.lastgroup[1:]) for m in self.pattern.finditer(text)]
+        return self.labels[min(found)] if found else self.default
+
+    # Labels of a whole column, as a categorical in taxonomy order
+    def classify(self, values):
+        values = pd.Series(values)
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        labels = pd.Categorical([self.classify_one(text) for text in uniques], categories=self.categories)
+        return pd.Series(labels.take(codes), index=values.index, name=values.name)
+
+
+reason_classifier = ReasonClassifier(REASON_TAXONOMY)
+subcategory_classifier = ReasonClassifier(SUBCATEGORY_TAXONOMY, default="Other")
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# Trailing-window statistics for every column, window and statistic in one pass over a 2-D array.
+# The window for a row at time t is (t - n days, t], the same as pandas' rolling(f"{n}D").
+#   - sum, mean and std come from cumulative sums: a window total is the difference of two prefix sums.
+#   - min and max come from a sparse table of minima/maxima over power-of-two row spans, so any window is
+#     covered by two overlapping spans. This is the vectorized stand-in for a monotonic deque, which would
+#     need a Python loop over the rows.
+# Missing values are skipped like pandas does; a window without any valid value gives NaN (std needs two).
+
+WINDOWS = (1, 3, 5, 7, 14, 30)
+STATS = ("mean", "min", "max", "std", "sum")
+
+# Column names follow add_avg_prev_columns: avg_{col}_prev_{n}d, and min_/max_/std_/sum_ for the rest
+STAT_PREFIX = {"mean": "avg", "min": "min", "max": "max", "std": "std", "sum": "sum"}
+
+
+# Row number where each row's trailing window starts
+def window_starts(times, days):
+    return np.searchsorted(times, times - np.timedelta64(pd.Timedelta(days=days)), side="right")
+
+
+# table[k][i] holds reduce(values[i:i + 2**k]) for every level k up to the longest window
+def sparse_table(values, reduce, max_length):
+    table = [values]
+    span = 1
+    while span * 2 <= max_length:
+        prev = table[-1]
+        level = prev.copy()
+        level[:len(prev) - span] = reduce(prev[:len(prev) - span], prev[span:])
+        table.append(level)
+        span *= 2
+    return np.stack(table)
+
+
+def range_reduce(table, reduce, starts, ends):
+    lengths = np.maximum(ends - starts, 1)
+    levels = np.floor(np.log2(lengths)).astype(np.intp)
+    return reduce(table[levels, starts], table[levels, ends - (1 << levels)])
+
+
+def rolling_features(df, columns, windows=WINDOWS, stats=STATS, date_col="DATE"):
+    times = df[date_col].to_numpy(dtype="datetime64[ns]")
+    if len(times) > 1 and (np.diff(times) < np.timedelta64(0)).any():
+        raise ValueError(f"{date_col} must be sorted")
+
+    values = df[columns].to_numpy(dtype="float64")
+    valid = ~np.isnan(values)
+    n = len(values)
+    ends = np.arange(1, n + 1)
+
+    # Prefix sums with a leading row of zeros, so window [start, end) is prefix[end] - prefix[start].
+    # Values are centred on the column mean first, which keeps the sum of squares from losing precision.
+    centre = np.nanmean(values, axis=0) if valid.any() else np.zeros(len(columns))
+    centre = np.where(np.isnan(centre), 0, centre)
+    centred = np.where(valid, values - centre, 0)
+    zeros = np.zeros((1, len(columns)))
+    count_sum = np.vstack([zeros, np.cumsum(valid, axis=0)])
+    value_sum = np.vstack([zeros, np.cumsum(centred, axis=0)])
+    square_sum = np.vstack([zeros, np.cumsum(centred ** 2, axis=0)])
+
+    starts = {days: window_starts(times, days) for days in windows}
+    max_length = max((int((ends - s).max()) for s in starts.values()), default=1) if n else 1
+    if "min" in stats:
+        min_table = sparse_table(np.where(valid, values, np.inf), np.minimum, max_length)
+    if "max" in stats:
+        max_table = sparse_table(np.where(valid, values, -np.inf), np.maximum, max_length)
+
+    features = {}
+    for days in windows:
+        start = starts[days]
+        count = count_sum[ends] - count_sum[start]
+        empty = count == 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            total = value_sum[ends] - value_sum[start]
+            mean = total / count
+            results = {
+                "sum": np.where(empty, np.nan, total + count * centre),
+                "mean": np.where(empty, np.nan, mean + centre),
+                "std": np.where(count < 2, np.nan, np.sqrt(np.maximum(
+                    (square_sum[ends] - square_sum[start] - total * mean) / (count - 1), 0))),
+            }
+            if "min" in stats:
+                results["min"] = np.where(empty, np.nan, range_reduce(min_table, np.minimum, start, ends))
+            if "max" in stats:
+                results["max"] = np.where(empty, np.nan, range_reduce(max_table, np.maximum, start, ends))
+
+        for stat in stats:
+            for i, col in enumerate(columns):
+                features[f"{STAT_PREFIX[stat]}_{col}_prev_{days}d"] = results[stat][:, i]
+
+    return pd.DataFrame(features, index=df.index)
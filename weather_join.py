@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# Point-in-time join of events to weather: every event gets the latest observation at or before its time,
+# from its own station, for one or more offsets at once.
+#   - by: the column of events naming the group (station or base), weather_by the matching column of the weather.
+#     Without them every event is matched against the whole weather frame, like merge_asof.
+#   - offsets: how long before the event to look, e.g. ("0h", "6h", "12h", "24h", "48h").
+#     Offset "0h" gets the weather's own column names, others get a suffix: temperature_6h_before.
+#   - tolerance: an observation older than this is stale and not used.
+# Each station's observation times are sorted once; all events and all offsets of that station are then one
+# searchsorted call. Matches that fail are listed in the unmatched report instead of leaving NaN rows behind.
+
+UNMATCHED_COLUMNS = ["event", "group", "offset", "reason"]
+
+
+def offset_suffix(offset):
+    offset = pd.Timedelta(offset)
+    if offset == pd.Timedelta(0):
+        return ""
+    hours = offset / pd.Timedelta(hours=1)
+    label = f"{hours:g}h" if hours == int(hours) else f"{offset.total_seconds():g}s"
+    return f"_{label}_before"
+
+
+def point_in_time_join(events, weather, offsets=("0h",), tolerance=None, by=None, weather_by=None,
+                       time_col="downed", date_col="DATE", columns=None):
+    columns = [col for col in weather.columns if col not in (date_col, weather_by)] if columns is None else columns
+    offsets = [pd.Timedelta(offset) for offset in offsets]
+    tolerance = None if tolerance is None else pd.Timedelta(tolerance).to_timedelta64()
+
+    event_times = events[time_col].to_numpy(dtype="datetime64[ns]")
+    event_groups = np.zeros(len(events), dtype=object) if by is None else events[by].to_numpy(dtype=object)
+    weather_groups = np.zeros(len(weather), dtype=object) if weather_by is None else weather[weather_by].to_numpy(
+        dtype=object)
+    weather_times = weather[date_col].to_numpy(dtype="datetime64[ns]")
+    weather_values = weather[columns].to_numpy(dtype="float64")
+
+    # Row of the weather frame matched for every event and offset, -1 where there is none
+    matches = np.full((len(offsets), len(events)), -1, dtype=np.int64)
+    reasons = np.full((len(offsets), len(events)), "", dtype=object)
+    reasons[:, pd.isna(event_times)] = "no event time"
+
+    station_rows = pd.Series(np.arange(len(weather))).groupby(weather_groups).indices
+    for group, event_rows in pd.Series(np.arange(len(events))).groupby(event_groups).indices.items():
+        if group not in station_rows:
+            reasons[:, event_rows] = "no weather for group"
+            continue
+        rows = station_rows[group]
+        rows = rows[np.argsort(weather_times[rows], kind="stable")]
+        times = weather_times[rows]
+
+        for i, offset in enumerate(offsets):
+            query = event_times[event_rows] - offset.to_timedelta64()
+            found = np.searchsorted(times, query, side="right") - 1
+            before = found < 0
+            stale = np.zeros(len(found), dtype=bool)
+            if tolerance is not None:
+                stale = ~before & (query - times[np.maximum(found, 0)] > tolerance)
+            ok = ~before & ~stale & ~np.isnat(query)
+            matches[i, event_rows[ok]] = rows[found[ok]]
+            reasons[i, event_rows[before & ~np.isnat(query)]] = "before first observation"
+            reasons[i, event_rows[stale]] = "stale"
+
+    joined = events.copy()
+    for i, offset in enumerate(offsets):
+        suffix = offset_suffix(offset)
+        matched = matches[i] >= 0
+        dates = np.full(len(events), np.datetime64("NaT"), dtype="datetime64[ns]")
+        dates[matched] = weather_times[matches[i, matched]]
+        values = np.full((len(events), len(columns)), np.nan)
+        values[matched] = weather_values[matches[i, matched]]
+        joined[date_col + suffix] = pd.Series(dates, index=events.index).astype(weather[date_col].dtype)
+        joined[[col + suffix for col in columns]] = values
+
+    failed_offset, failed_event = np.nonzero(matches < 0)
+    unmatched = pd.DataFrame({
+        "event": events.index[failed_event],
+        "group": event_groups[failed_event],
+        "offset": [offsets[i] for i in failed_offset],
+        "reason": reasons[failed_offset, failed_event],
+    }, columns=UNMATCHED_COLUMNS)
+    return joined, unmatched